@@ -77,3 +77,11 @@ if [[ $? != 0 ]]; then
     exit -1
 fi
 
+
+# Update the stored corpus statistics by the concept supports of the new documents
+python3 -m narraplay.documentranking.corpus -c $2
+
+if [[ $? != 0 ]]; then
+    echo "Previous script returned exit code != 0 -> Stopping pipeline."
+    exit -1
+fi
@@ -1,3 +1,5 @@
+import argparse
+
 import pyterrier as pt
 from tqdm import tqdm
 
@@ -6,11 +8,16 @@ from narraplay.documentranking.run_config import BENCHMARKS
 
 
 def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=1,
+                        help="number of threads that retrieve the topics of a benchmark in parallel (default: 1)")
+    args = parser.parse_args()
+
     if not pt.started():
         pt.init()
     for benchmark in tqdm(BENCHMARKS):
         index = BenchmarkIndex(benchmark)
-        index.perform_bm25_retrieval()
+        index.perform_bm25_retrieval(threads=args.threads)
 
     return 0
 
@@ -13,7 +13,7 @@ from nltk.corpus import stopwords
 from narrant.entitylinking.enttypes import SPECIES
 from narraplay.documentranking.config import DATA_DIR, PM2020_TOPIC_FILE, PUBMED_BASELINE_ID_DIR, \
     TRIP_CLICK_TOPIC_FILES, TRIP_JUDGE_TOPIC_FILES, RUNS_DIR, QRELS_PATH, DATASET_TO_PUBMED_BASE_ID_FILE, \
-    RESULT_DIR_TOPICS, MINIMUM_TRANSLATION_THRESHOLD
+    RESULT_DIR_TOPICS, MINIMUM_TRANSLATION_THRESHOLD, USE_MASTER_INDEX
 from narraplay.documentranking.entity_tagger_like import EntityTaggerLike
 
 DRUG = "Drug"
@@ -367,6 +367,26 @@ class Benchmark:
             self.documents_for_baseline_load = True
         return self.documents_for_baseline
 
+    def is_document_in_baseline(self, document_id_source: str, collection: str) -> bool:
+        """
+        :return: whether a document is part of the benchmark baseline (only PubMed documents are filtered)
+        """
+        baseline = self.get_documents_for_baseline()
+        return not baseline or collection != 'PubMed' or int(document_id_source) in baseline
+
+    def get_index_name(self) -> str:
+        """
+        Master indexes (config.USE_MASTER_INDEX) contain all documents of a collection set and are named after it,
+        e.g., "PubMed_trec-pm-201X-extra" is shared by the TREC PM 2017-2019 abstract benchmarks and "PubMed" is used
+        by trec-pm-2020-abstracts. BM25 scores depend on the collection statistics of the whole index, i.e., runs on
+        a master index are not comparable with runs on per-benchmark indexes.
+        :return: the name of the BM25 index, i.e., the master index of the document collections or the benchmark
+        """
+        if not USE_MASTER_INDEX:
+            return self.name
+        name = '_'.join(self.document_collections)
+        return f'{name}_fulltexts' if self.has_fulltexts else name
+
     def get_relevant_documents(self):
         relevant_documents = set()
         for _, doc_ids in self.topic_id2docs.items():
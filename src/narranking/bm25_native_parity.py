@@ -0,0 +1,90 @@
+import argparse
+import os
+
+import pandas as pd
+import pyterrier as pt
+
+from narraplay.documentranking.config import PYTERRIER_INDEX_PATH, NATIVE_BM25_PATH
+from narraplay.documentranking.rankers.bm25_index_manager import BM25IndexManager
+from narraplay.documentranking.run_config import BENCHMARKS
+
+# maximum absolute score difference between the native scorer and Terrier
+MAX_SCORE_DIFFERENCE = 1e-4
+
+
+def filter_query_string(query):
+    return "".join([x if x.isalnum() else " " for x in query])
+
+
+def score_with_terrier(pipeline, query: str, docnos: [str]):
+    df = pd.DataFrame([["q0", query, docno] for docno in docnos], columns=["qid", "query", "docno"])
+    rtr = pipeline(df)
+    return {row["docno"]: float(row["score"]) for _, row in rtr.iterrows()}
+
+
+def rank(docno2score: dict):
+    return [docno for docno, _ in sorted(docno2score.items(), key=lambda x: (x[1], x[0]), reverse=True)]
+
+
+def check_benchmark(bench, no_topics: int) -> bool:
+    """
+    Scores the baseline documents of sample topics with the native scorer and with Terrier
+    :param bench: the benchmark
+    :param no_topics: number of topics to check (0 = all topics)
+    :return: whether all scores agree up to MAX_SCORE_DIFFERENCE and all rankings are identical
+    """
+    index_path = os.path.join(PYTERRIER_INDEX_PATH, bench.get_index_name())
+    native_path = os.path.join(NATIVE_BM25_PATH, bench.get_index_name())
+    manager = BM25IndexManager.instance()
+    native_bm25 = manager.acquire_native(index_path, native_path)
+    pipeline = pt.BatchRetrieve(manager.acquire(index_path), wmodel='BM25',
+                                properties={'termpipelines': 'Stopwords,PorterStemmer'})
+
+    topics = bench.topics[:no_topics] if no_topics > 0 else bench.topics
+    max_difference, different_rankings = 0.0, 0
+    for q in topics:
+        docnos = [str(d) for d in bench.topic_id2docs.get(str(q.query_id), [])]
+        if not docnos:
+            continue
+        query = filter_query_string(q.get_benchmark_string())
+        terrier_scores = score_with_terrier(pipeline, query, docnos)
+        native_scores = dict(native_bm25.score(query, docnos))
+
+        if terrier_scores.keys() != native_scores.keys():
+            print(f'Topic {q.query_id}: scored documents differ '
+                  f'(Terrier only: {len(terrier_scores.keys() - native_scores.keys())} / '
+                  f'native only: {len(native_scores.keys() - terrier_scores.keys())})')
+        for docno in terrier_scores.keys() | native_scores.keys():
+            difference = abs(terrier_scores.get(docno, 0.0) - native_scores.get(docno, 0.0))
+            max_difference = max(max_difference, difference)
+        if rank(terrier_scores) != rank(native_scores):
+            print(f'Topic {q.query_id}: rankings differ')
+            different_rankings += 1
+
+    manager.release(index_path)
+    manager.release(native_path)
+    print(f'{bench.name}: {len(topics)} topics / max |score difference| = {max_difference} / '
+          f'{different_rankings} different rankings')
+    return max_difference <= MAX_SCORE_DIFFERENCE and different_rankings == 0
+
+
+def main():
+    """
+    Checks that the native BM25 scorer (run_config.USE_NATIVE_BM25) reproduces Terrier's BM25 scores and rankings
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--topics", type=int, default=10, help="number of topics per benchmark (0 = all topics)")
+    args = parser.parse_args()
+
+    if not pt.started():
+        pt.init()
+
+    failed = [bench.name for bench in BENCHMARKS if not check_benchmark(bench, args.topics)]
+    if failed:
+        print(f'Native BM25 scores differ from Terrier for: {failed}')
+        exit(1)
+    print('Native BM25 scores agree with Terrier')
+
+
+if __name__ == "__main__":
+    main()
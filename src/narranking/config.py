@@ -37,12 +37,32 @@ if not os.path.exists(RESULT_DIR_BASELINES):
 
 RESULT_DIR_LTR = os.path.join(RESULT_DIR, "LearningToRank")
 RESULT_DIR_HYPERPARAMS = os.path.join(RESULT_DIR, "HyperparameterSearch")
+RANKER_CACHE_DIR = os.path.join(RESULT_DIR, "ranker_cache")
 
 PYTERRIER_INDEX_PATH = os.path.join(DATA_DIR, "pyterrier_indexes")
 if not os.path.exists(PYTERRIER_INDEX_PATH):
     os.makedirs(PYTERRIER_INDEX_PATH)
 
+# opt-in: one BM25 index per collection set shared by benchmarks (see Benchmark.get_index_name)
+USE_MASTER_INDEX = False
+# factor by which the BM25 retrieval depth is increased until enough documents pass the baseline filter
+BM25_DEEPENING_FACTOR = 4
+# documents that are appended to an existing index are kept in a delta index ("delta") or merged into it ("merge")
+INDEX_APPEND_MODE = "merge"
+
 DOCUMENT_TEXT_INDEX_PATH = os.path.join(PYTERRIER_INDEX_PATH, "Document_all_text")
+# collection statistics and term vectors of the PyTerrier indexes exported for the native BM25 scorer
+NATIVE_BM25_PATH = os.path.join(DATA_DIR, "native_bm25")
+
+PREDICATION_LOOKUP_PATH = os.path.join(DATA_DIR, "predication_lookup")
+# number of predication ids that are resolved with one database query
+PREDICATION_QUERY_BATCH_SIZE = 10000
+# compare the predication lookup table with the Predication table when it is loaded (stale tables are not used)
+CHECK_PREDICATION_LOOKUP = False
+
+CORPUS_STATISTICS_DIR = os.path.join(DATA_DIR, "corpus_statistics")
+if not os.path.exists(CORPUS_STATISTICS_DIR):
+    os.makedirs(CORPUS_STATISTICS_DIR)
 
 if not os.path.exists(DIAGRAMS_DIR):
     os.makedirs(DIAGRAMS_DIR)
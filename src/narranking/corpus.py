@@ -1,34 +1,82 @@
+import argparse
+import glob
+import json
 import logging
 import math
+import os
+from collections import defaultdict
+from typing import Set
 
+from sqlalchemy import and_, func
 from tqdm import tqdm
 
-from kgextractiontoolbox.backend.models import Document
+from kgextractiontoolbox.backend.models import Document, Tag
 from narraint.backend.database import SessionExtended
 from narraint.backend.models import PredicationInvertedIndex, TagInvertedIndex
 from narrant.cleaning.pharmaceutical_vocabulary import SYMMETRIC_PREDICATES
+from narraplay.documentranking.config import CORPUS_STATISTICS_DIR
+
+DELTA_QUERY_BATCH_SIZE = 10000
 
 
 class DocumentCorpus:
 
-    def __init__(self, collections: [str]):
+    def __init__(self, collections: [str], validate: bool = True):
+        """
+        :param collections: the document collections of the corpus
+        :param validate: rebuild stored statistics if the documents of a collection have changed in the database
+        """
         self.collections = collections
+        self.cache_statement2count = dict()
+        self.cache_concept2support = dict()
+        self.all_idf_data_cached = False
+        self.statistics_path = os.path.join(CORPUS_STATISTICS_DIR, f'{"_".join(sorted(self.collections))}.json')
+        # number of documents and maximum document id per collection when the statistics were computed
+        self.collection2count = dict()
+        self.collection2max_id = dict()
 
-        logging.info(f'Estimating size of document corpus (collections = {self.collections})')
-        session = SessionExtended.get()
-        self.document_count = 0
-        for collection in collections:
-            logging.info(f'Counting documents in collection: {collection}')
-            col_count = session.query(Document.id).filter(Document.collection == collection).count()
-            self.document_count += col_count
-            logging.info(f'{col_count} documents found')
+        if os.path.isfile(self.statistics_path):
+            self.load_statistics()
+            if validate:
+                collection2count, collection2max_id = self.count_collections()
+                if collection2count != self.collection2count or collection2max_id != self.collection2max_id:
+                    print(f'Documents have changed since the statistics were computed '
+                          f'({self.collection2count} -> {collection2count}) - rebuilding statistics')
+                    self.build_statistics(collection2count, collection2max_id)
+        else:
+            self.build_statistics(*self.count_collections())
 
+    def build_statistics(self, collection2count: dict, collection2max_id: dict):
+        self.collection2count = collection2count
+        self.collection2max_id = collection2max_id
+        self.document_count = sum(collection2count.values())
         logging.info(f'{self.document_count} documents in corpus')
-        self.cache_statement2count = dict()
         self.cache_concept2support = dict()
-        self.all_idf_data_cached = False
         self.load_all_support_into_memory()
+        self.store_statistics()
 
+    def count_collections(self):
+        """
+        Counts the documents of each collection
+        :return: a dictionary mapping a collection to its number of documents and one to its maximum document id
+        """
+        logging.info(f'Estimating size of document corpus (collections = {self.collections})')
+        session = SessionExtended.get()
+        collection2count, collection2max_id = dict(), dict()
+        for collection in self.collections:
+            logging.info(f'Counting documents in collection: {collection}')
+            col_count, col_max_id = session.query(func.count(Document.id), func.max(Document.id)) \
+                .filter(Document.collection == collection).one()
+            collection2count[collection] = col_count
+            collection2max_id[collection] = col_max_id
+            logging.info(f'{col_count} documents found')
+        return collection2count, collection2max_id
+
+    def count_documents(self):
+        collection2count, _ = self.count_collections()
+        document_count = sum(collection2count.values())
+        logging.info(f'{document_count} documents in corpus')
+        return document_count
 
     def load_all_support_into_memory(self):
         session = SessionExtended.get()
@@ -55,6 +103,132 @@ class DocumentCorpus:
         self.all_idf_data_cached = True
         print('Finished')
 
+    def load_statistics(self):
+        print(f'Loading corpus statistics from {self.statistics_path}')
+        with open(self.statistics_path, 'rt') as f:
+            statistics = json.load(f)
+        self.document_count = statistics["document_count"]
+        # statistics of older versions do not contain the collection sizes (they are rebuilt on validation)
+        self.collection2count = statistics.get("collection2count", dict())
+        self.collection2max_id = statistics.get("collection2max_id", dict())
+        self.cache_concept2support = statistics["concept2support"]
+        self.all_idf_data_cached = True
+        logging.info(f'{self.document_count} documents in corpus')
+
+    def store_statistics(self):
+        print(f'Writing corpus statistics to {self.statistics_path}')
+        # write to a temporary file first so that an interrupted write does not destroy the statistics
+        tmp_path = self.statistics_path + '.tmp'
+        with open(tmp_path, 'wt') as f:
+            json.dump(dict(collections=sorted(self.collections),
+                           document_count=self.document_count,
+                           collection2count=self.collection2count,
+                           collection2max_id=self.collection2max_id,
+                           concept2support=self.cache_concept2support), f)
+        os.replace(tmp_path, self.statistics_path)
+
+    @staticmethod
+    def _query_concept_supports_for_documents(document_collection: str, document_ids: Set[int]):
+        """
+        Computes the concept supports (number of documents that mention a concept) for a set of documents
+        :param document_collection: the collection of the documents
+        :param document_ids: a set of document ids
+        :return: a dictionary mapping each concept to its support within the given documents
+        """
+        session = SessionExtended.get()
+        concept2support = defaultdict(int)
+        document_ids = sorted(document_ids)
+        for i in range(0, len(document_ids), DELTA_QUERY_BATCH_SIZE):
+            batch = document_ids[i:i + DELTA_QUERY_BATCH_SIZE]
+            # the inverted index counts a document once per concept and type
+            q = session.query(Tag.document_id, Tag.ent_id, Tag.ent_type).distinct()
+            q = q.filter(and_(Tag.document_collection == document_collection, Tag.document_id.in_(batch)))
+            for row in q:
+                concept2support[row.ent_id] += 1
+        return concept2support
+
+    def apply_document_delta(self, document_collection: str, added_document_ids: Set[int] = None,
+                             removed_document_ids: Set[int] = None):
+        """
+        Updates the corpus statistics by the concept supports of added and removed documents only
+        Tags of added documents must already be loaded, tags of removed documents must still be present
+        :param document_collection: the collection that has been changed
+        :param added_document_ids: ids of the newly added documents
+        :param removed_document_ids: ids of the documents that will be removed
+        :return: None
+        """
+        if document_collection not in self.collections:
+            raise ValueError(f'Collection {document_collection} is not part of the corpus ({self.collections})')
+        added_document_ids = added_document_ids or set()
+        removed_document_ids = removed_document_ids or set()
+        print(f'Applying delta to corpus statistics ({document_collection}: {len(added_document_ids)} added / '
+              f'{len(removed_document_ids)} removed documents)')
+
+        for concept, support in self._query_concept_supports_for_documents(document_collection,
+                                                                           added_document_ids).items():
+            if concept in self.cache_concept2support:
+                self.cache_concept2support[concept] += support
+            else:
+                self.cache_concept2support[concept] = support
+
+        for concept, support in self._query_concept_supports_for_documents(document_collection,
+                                                                           removed_document_ids).items():
+            if concept not in self.cache_concept2support:
+                continue
+            remaining = self.cache_concept2support[concept] - support
+            if remaining > 0:
+                self.cache_concept2support[concept] = remaining
+            else:
+                del self.cache_concept2support[concept]
+
+        self.document_count += len(added_document_ids) - len(removed_document_ids)
+        if document_collection in self.collection2count:
+            self.collection2count[document_collection] += len(added_document_ids) - len(removed_document_ids)
+        if added_document_ids and document_collection in self.collection2max_id:
+            self.collection2max_id[document_collection] = max(self.collection2max_id[document_collection] or 0,
+                                                              max(added_document_ids))
+        logging.info(f'{self.document_count} documents in corpus')
+        self.store_statistics()
+
+    def get_new_document_ids(self, document_collection: str) -> Set[int]:
+        """
+        :return: ids of the documents that were added to the collection after the statistics were computed
+        (document ids are assigned in increasing order)
+        """
+        session = SessionExtended.get()
+        q = session.query(Document.id).filter(Document.collection == document_collection)
+        max_id = self.collection2max_id.get(document_collection)
+        if max_id is not None:
+            q = q.filter(Document.id > max_id)
+        return set(row[0] for row in q)
+
+    @staticmethod
+    def apply_document_delta_to_all(document_collection: str, added_document_ids: Set[int] = None,
+                                    removed_document_ids: Set[int] = None):
+        """
+        Applies a document delta to every stored statistics file whose corpus contains the collection
+        If no document ids are given, the documents with ids above the maximum id of each statistics file are added
+        :param document_collection: the collection that has been changed
+        :param added_document_ids: ids of the newly added documents
+        :param removed_document_ids: ids of the documents that will be removed
+        :return: None
+        """
+        for path in sorted(glob.glob(os.path.join(CORPUS_STATISTICS_DIR, '*.json'))):
+            with open(path, 'rt') as f:
+                statistics = json.load(f)
+            collections = statistics["collections"]
+            if document_collection not in collections:
+                continue
+            if "collection2max_id" not in statistics:
+                # statistics of older versions cannot be updated incrementally (validation rebuilds them)
+                DocumentCorpus(collections)
+                continue
+            corpus = DocumentCorpus(collections, validate=False)
+            added = added_document_ids
+            if added_document_ids is None and removed_document_ids is None:
+                added = corpus.get_new_document_ids(document_collection)
+            corpus.apply_document_delta(document_collection, added, removed_document_ids)
+
     def get_idf_score(self, statement: tuple):
         return math.log(self.get_document_count() / self.get_statement_documents(statement))
 
@@ -121,3 +295,26 @@ class DocumentCorpus:
         # assert support > 0
 
         return support
+
+
+def read_document_ids(path: str) -> Set[int]:
+    with open(path, 'rt') as f:
+        return set(int(line.strip()) for line in f if line.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Applies a document delta of a collection to all stored corpus "
+                                                 "statistics that contain the collection")
+    parser.add_argument("-c", "--collection", required=True, help="the changed document collection")
+    parser.add_argument("--added", help="file with the ids of the added documents (one id per line)")
+    parser.add_argument("--removed", help="file with the ids of the documents that will be removed "
+                                          "(their tags must still be present)")
+    args = parser.parse_args()
+
+    added = read_document_ids(args.added) if args.added else None
+    removed = read_document_ids(args.removed) if args.removed else None
+    DocumentCorpus.apply_document_delta_to_all(args.collection, added, removed)
+
+
+if __name__ == "__main__":
+    main()
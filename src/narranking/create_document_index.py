@@ -1,7 +1,15 @@
+import argparse
+import itertools
+import multiprocessing
 import os
+import resource
+import shutil
+from typing import List
 
+import numpy as np
 import pandas as pd
 import pyterrier as pt
+from sqlalchemy import func
 from tqdm import tqdm
 
 from kgextractiontoolbox.backend.database import Session
@@ -9,95 +17,465 @@ from kgextractiontoolbox.backend.models import Document
 from kgextractiontoolbox.backend.retrieve import iterate_over_all_documents_in_collection
 from narraplay.documentranking.benchmark import Benchmark
 from narraplay.documentranking.config import PYTERRIER_INDEX_PATH, \
-    BM25_RANKED_DOCUMENT_CUTOFF, RESULT_DIR_FIRST_STAGE, RESULT_DIR_BASELINES
+    BM25_RANKED_DOCUMENT_CUTOFF, RESULT_DIR_FIRST_STAGE, RESULT_DIR_BASELINES, USE_MASTER_INDEX, BM25_DEEPENING_FACTOR, \
+    INDEX_APPEND_MODE
+from narraplay.documentranking.rankers.bm25_index_manager import get_delta_index_paths, open_index
 from narraplay.documentranking.run_config import BENCHMARKS
 from narraplay.documentranking.translator import DocumentTranslator
 
+# maximum length of a document id that is stored in the meta index
+DOCNO_LENGTH = 32
+# maximum length of a collection name that is stored in the meta index
+COLLECTION_LENGTH = 64
+# number of docnos that are read from the meta index at once
+META_BATCH_SIZE = 100000
+# number of consecutive document ids that are retrieved at once when documents are streamed by id ranges
+ID_WINDOW_SIZE = 10000
+
+
+def _build_index_shard(task):
+    bench_idx, shard_path, id_ranges, stemmer, stopwords = task
+    if not pt.started():
+        pt.init()
+    shard = BenchmarkIndex(BENCHMARKS[bench_idx], load=False)
+    documents = shard.iterate_documents(id_ranges=id_ranges)
+    # Terrier cannot build an index without documents
+    first_document = next(documents, None)
+    if first_document is None:
+        return None
+    BenchmarkIndex.index_documents(shard_path, itertools.chain([first_document], documents), stemmer, stopwords)
+    return shard_path
+
 
 class BenchmarkIndex:
 
-    def __init__(self, benchmark: Benchmark):
+    def __init__(self, benchmark: Benchmark, load: bool = True, workers: int = 1, append: bool = False):
+        """
+        :param benchmark: the benchmark
+        :param load: load the index of the benchmark (it is created first if it does not exist)
+        :param workers: number of processes that build index shards in parallel if the index is created
+        :param append: index the documents that are missing in an existing index (see INDEX_APPEND_MODE)
+        """
         self.benchmark = benchmark
         self.name = benchmark.name
-        self.path = os.path.join(PYTERRIER_INDEX_PATH, self.name)
+        # a master index contains all documents of the collections, the baseline is applied at retrieval time
+        self.use_master_index = USE_MASTER_INDEX
+        self.path = os.path.join(PYTERRIER_INDEX_PATH, benchmark.get_index_name())
         self.index = None
+        if not load:
+            return
         if os.path.isdir(self.path):
+            if append:
+                self.append_documents()
             print(f'Loading index from {self.path}')
-            self.index = pt.IndexFactory.of(self.path, memory=True)
+            self.index = open_index(self.path, memory=True)
         else:
-            self.create_index()
+            self.create_index(workers=workers)
+
+    def get_id_ranges(self, shards: int) -> List[dict]:
+        """
+        Partitions the document ids of each collection into contiguous ranges of equal width
+        :param shards: number of shards
+        :return: a list with one dictionary per shard mapping a collection to its [start, end) id range
+        """
+        session = Session.get()
+        shard_ranges = [dict() for _ in range(shards)]
+        for collection in self.benchmark.document_collections:
+            min_id, max_id = session.query(func.min(Document.id), func.max(Document.id)) \
+                .filter(Document.collection == collection).one()
+            if min_id is None:
+                continue
+            bounds = np.linspace(min_id, max_id + 1, shards + 1).astype(np.int64).tolist()
+            for shard, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+                if start < end:
+                    shard_ranges[shard][collection] = (start, end)
+        return shard_ranges
 
-    def create_index(self, stemmer="EnglishSnowballStemmer", stopwords="terrier"):
-        values = []
+    def iterate_documents(self, id_ranges: dict = None, known_docnos: set = None):
+        """
+        Streams the documents of all benchmark collections
+        PubMed documents are filtered by the baseline on the fly (unless a master index is built)
+        :param id_ranges: only stream documents in the [start, end) id range of each collection (optional)
+        :param known_docnos: skip documents with these docnos, e.g., documents that are already indexed (optional)
+        :return: a generator of dictionaries with the docno and the text of a document
+        """
         session = Session.get()
         translator = DocumentTranslator()
-        print(f'Create index for {self.name} (collections = {self.benchmark.document_collections})')
+        no_documents = 0
         for collection in self.benchmark.document_collections:
-            print(f'\nIterating over all documents in {collection}')
-            total = session.query(Document).filter(Document.collection == collection).count()
+            query = session.query(Document).filter(Document.collection == collection)
+            if id_ranges is not None:
+                if collection not in id_ranges:
+                    continue
+                start, end = id_ranges[collection]
+                query = query.filter(Document.id >= start).filter(Document.id < end)
+                print(f'\nIterating over documents in {collection} (ids {start} to {end - 1})')
+                # the toolbox only filters by id lists, so the range is streamed in windows of consecutive ids
+                windows = [set(range(w_start, min(w_start + ID_WINDOW_SIZE, end)))
+                           for w_start in range(start, end, ID_WINDOW_SIZE)]
+            else:
+                print(f'\nIterating over all documents in {collection}')
+                windows = [None]
+            total = query.count()
+            if total == 0:
+                continue
             known_ids = set()
             # we focus on titles and abstract if not otherwise specified by benchmark
             consider_sections = self.benchmark.has_fulltexts
+            baseline = None
+            if collection == 'PubMed' and not self.use_master_index:
+                baseline = self.benchmark.get_documents_for_baseline()
 
             # iterate over all documents for that collection
-            for d in tqdm(
-                    iterate_over_all_documents_in_collection(session, collection, consider_sections=consider_sections),
-                    total=total):
-
+            documents = itertools.chain.from_iterable(
+                iterate_over_all_documents_in_collection(session, collection, document_ids=window,
+                                                         consider_sections=consider_sections)
+                for window in windows)
+            for d in tqdm(documents, total=total):
                 doc_id_source = translator.translate_document_id_art2source(d.id, collection)
                 # Filter on PubMed documents
-                if collection == 'PubMed' and self.benchmark.get_documents_for_baseline():
-                    if int(doc_id_source) not in self.benchmark.get_documents_for_baseline():
-                        # Skip documents that are not relevant for that baseline
-                        continue
+                if baseline and int(doc_id_source) not in baseline:
+                    # Skip documents that are not relevant for that baseline
+                    continue
 
                 # ensure that each source id is unique
                 assert doc_id_source not in known_ids
                 known_ids.add(doc_id_source)
+                if known_docnos is not None and str(doc_id_source) in known_docnos:
+                    continue
 
                 text = d.get_text_content(sections=consider_sections)
                 if text.strip():
-                    values.append([str(doc_id_source), text])
+                    no_documents += 1
+                    yield {'docno': str(doc_id_source), 'collection': collection, 'text': text}
         print()
-        print(f'{len(values)} documents retrieved...')
-        print('Creating dataframe...')
-        df = pd.DataFrame(values, columns=['docno', 'text'])
-        print('Creating index...')
-        pd_indexer = pt.DFIndexer(self.path, verbose=True, overwrite=True, stemmer=stemmer, stopwords=stopwords)
-        self.index = pd_indexer.index(df["text"], df["docno"])
+        print(f'{no_documents} documents indexed...')
+
+    @staticmethod
+    def index_documents(path: str, documents, stemmer: str, stopwords: str):
+        """
+        Streams documents into a new PyTerrier index
+        :param path: path of the index
+        :param documents: an iterable of dictionaries with the docno and the text of a document
+        :return: the index reference
+        """
+        # documents are streamed into the indexer (they are never held in memory together)
+        indexer = pt.IterDictIndexer(path, verbose=True, overwrite=True, stemmer=stemmer, stopwords=stopwords,
+                                     meta={'docno': DOCNO_LENGTH, 'collection': COLLECTION_LENGTH})
+        return indexer.index(documents)
+
+    @staticmethod
+    def merge_indexes(index_paths: List[str], path: str):
+        """
+        Merges PyTerrier indexes pairwise into a single index with Terrier's StructureMerger
+        The documents keep the order of the given indexes. The lexicon and the collection statistics are merged,
+        i.e., BM25 scores should be identical to an index that is built over all documents at once
+        (verify with index_merge_check.py).
+        :param index_paths: paths of the indexes that are merged (they are not modified)
+        :param path: path of the merged index
+        :return: the index reference of the merged index
+        """
+        index_on_disk = pt.autoclass("org.terrier.structures.IndexOnDisk")
+        structure_merger = pt.autoclass("org.terrier.structures.merging.StructureMerger")
+        if len(index_paths) == 1:
+            shutil.copytree(index_paths[0], path)
+            return pt.IndexRef.of(os.path.join(path, "data.properties"))
+
+        # intermediate indexes of the merge levels (only these are removed, never the given indexes)
+        intermediate_paths = set()
+        # only open the structures that are merged
+        index_on_disk.setIndexLoadingProfileAsRetrieval(False)
+        try:
+            level = 0
+            while len(index_paths) > 1:
+                merged_paths = []
+                for i in range(0, len(index_paths) - 1, 2):
+                    merged_path = path if len(index_paths) == 2 else f'{path}_merge_{level}_{i // 2}'
+                    print(f'Merging {index_paths[i]} and {index_paths[i + 1]} into {merged_path}')
+                    os.makedirs(merged_path, exist_ok=True)
+                    if merged_path != path:
+                        intermediate_paths.add(merged_path)
+                    src_index1 = index_on_disk.createIndex(index_paths[i], "data")
+                    src_index2 = index_on_disk.createIndex(index_paths[i + 1], "data")
+                    dest_index = index_on_disk.createNewIndex(merged_path, "data")
+                    structure_merger(src_index1, src_index2, dest_index).mergeStructures()
+                    src_index1.close()
+                    src_index2.close()
+                    dest_index.close()
+                    # remove intermediate results of previous merge levels
+                    for merged_input in [index_paths[i], index_paths[i + 1]]:
+                        if merged_input in intermediate_paths:
+                            shutil.rmtree(merged_input)
+                            intermediate_paths.remove(merged_input)
+                    merged_paths.append(merged_path)
+                if len(index_paths) % 2 == 1:
+                    merged_paths.append(index_paths[-1])
+                index_paths = merged_paths
+                level += 1
+        finally:
+            index_on_disk.setIndexLoadingProfileAsRetrieval(True)
+            # intermediate results that are left after a failed merge
+            for intermediate_path in intermediate_paths:
+                shutil.rmtree(intermediate_path, ignore_errors=True)
+        return pt.IndexRef.of(os.path.join(path, "data.properties"))
+
+    @staticmethod
+    def find_duplicate_documents(path: str) -> set:
+        """
+        Reads the meta index of an index in batches and finds documents that are indexed more than once
+        :param path: path of the index
+        :return: the (collection, docno) pairs that occur more than once
+        """
+        index = pt.IndexFactory.of(path)
+        meta_index = index.getMetaIndex()
+        no_documents = index.getCollectionStatistics().getNumberOfDocuments()
+        print(f'Checking {no_documents} docnos of {path} for duplicates')
+        known, duplicates = set(), set()
+        for start in tqdm(range(0, no_documents, META_BATCH_SIZE)):
+            docids = list(range(start, min(start + META_BATCH_SIZE, no_documents)))
+            for key in zip(meta_index.getItems("collection", docids), meta_index.getItems("docno", docids)):
+                if key in known:
+                    duplicates.add(key)
+                known.add(key)
+        index.close()
+        return duplicates
+
+    def get_indexed_docnos(self) -> set:
+        """
+        :return: the docnos of all documents in the index and its delta indexes
+        """
+        docnos = set()
+        for path in [self.path] + get_delta_index_paths(self.path):
+            index = pt.IndexFactory.of(path)
+            meta_index = index.getMetaIndex()
+            no_documents = index.getCollectionStatistics().getNumberOfDocuments()
+            print(f'Reading {no_documents} docnos from {path}')
+            for start in tqdm(range(0, no_documents, META_BATCH_SIZE)):
+                docids = list(range(start, min(start + META_BATCH_SIZE, no_documents)))
+                docnos.update(meta_index.getItems("docno", docids))
+            index.close()
+        return docnos
+
+    @staticmethod
+    def get_meta_layout(index_path: str) -> List[tuple]:
+        """
+        Reads the meta index layout from the properties of a PyTerrier index (without the JVM)
+        :return: a list of (key, maximum value length) of the meta index
+        """
+        properties = dict()
+        with open(os.path.join(index_path, 'data.properties'), 'rt') as f:
+            for line in f:
+                if '=' in line and not line.startswith('#'):
+                    key, value = line.strip().split('=', 1)
+                    properties[key] = value
+        keys = properties.get('index.meta.key-names', '').split(',')
+        lengths = [int(length) for length in properties.get('index.meta.value-lengths', '').split(',') if length]
+        return list(zip(keys, lengths))
+
+    @staticmethod
+    def check_appendable(path: str):
+        """
+        Checks that documents can be appended to an existing index
+        Terrier takes the meta index layout of a merged index or a MultiIndex from the first index, so all indexes
+        must have the layout of new delta indexes. An interrupted merge must not be continued.
+        :param path: path of the existing index
+        """
+        backup_path = f'{path}_backup'
+        if os.path.exists(backup_path):
+            raise ValueError(f'{backup_path} of an interrupted merge exists - check whether {path} contains the '
+                             f'merged documents, remove {backup_path} (or restore it) and append again')
+        merged_path = f'{path}_merged'
+        if os.path.exists(merged_path):
+            # the incomplete result of an interrupted merge (the merged indexes are not modified)
+            print(f'Removing {merged_path} of an interrupted merge')
+            shutil.rmtree(merged_path)
+
+        expected_layout = [('docno', DOCNO_LENGTH), ('collection', COLLECTION_LENGTH)]
+        for index_path in [path] + get_delta_index_paths(path):
+            layout = BenchmarkIndex.get_meta_layout(index_path)
+            if layout != expected_layout:
+                raise ValueError(f'Meta index layout of {index_path} ({layout}) differs from the layout of new '
+                                 f'documents ({expected_layout}) - rebuild the index instead of appending')
+
+    @staticmethod
+    def append_to_index(path: str, documents, stemmer: str, stopwords: str, mode: str = INDEX_APPEND_MODE) -> bool:
+        """
+        Indexes documents into a new delta index of an existing index ("delta") or merges them into the index
+        ("merge", existing delta indexes are merged as well)
+        :param path: path of the existing index
+        :param documents: an iterable of dictionaries with the docno and the text of a document
+        :param stemmer: the stemmer of the existing index
+        :param stopwords: the stop words of the existing index
+        :param mode: "delta" or "merge"
+        :return: whether documents were appended
+        """
+        if mode not in ["delta", "merge"]:
+            raise ValueError(f'Unknown index append mode: {mode}')
+        BenchmarkIndex.check_appendable(path)
+        documents = iter(documents)
+        first_document = next(documents, None)
+        if first_document is None:
+            return False
+
+        delta_paths = get_delta_index_paths(path)
+        no_delta = int(delta_paths[-1].rsplit('_', 1)[1]) + 1 if delta_paths else 0
+        delta_path = f'{path}_delta_{no_delta}'
+        BenchmarkIndex.index_documents(delta_path, itertools.chain([first_document], documents), stemmer, stopwords)
+        if mode == "merge":
+            merged_path = f'{path}_merged'
+            BenchmarkIndex.merge_indexes([path] + delta_paths + [delta_path], merged_path)
+            # replace the index by the merged index
+            backup_path = f'{path}_backup'
+            os.rename(path, backup_path)
+            os.rename(merged_path, path)
+            # the backup is removed last, i.e., it marks a merge whose delta indexes might not be removed yet
+            for removed_path in delta_paths + [delta_path, backup_path]:
+                shutil.rmtree(removed_path, ignore_errors=True)
+        return True
+
+    def append_documents(self, stemmer="EnglishSnowballStemmer", stopwords="terrier", mode: str = INDEX_APPEND_MODE):
+        """
+        Indexes the documents of the collections that are missing in the existing index
+        The missing documents are found by comparing the docnos of the index with the collections. They are either
+        kept in a new delta index ("delta", BM25 retrieves over the index and its delta indexes) or merged into the
+        index ("merge").
+        :param stemmer: the stemmer of the existing index
+        :param stopwords: the stop words of the existing index
+        :param mode: "delta" or "merge"
+        """
+        if mode not in ["delta", "merge"]:
+            raise ValueError(f'Unknown index append mode: {mode}')
+        print(f'Appending missing documents to {self.path} (mode = {mode})')
+        BenchmarkIndex.check_appendable(self.path)
+        documents = self.iterate_documents(known_docnos=self.get_indexed_docnos())
+        if not BenchmarkIndex.append_to_index(self.path, documents, stemmer, stopwords, mode):
+            print('Index is up to date')
+            return
         print('Finished!')
 
-    def perform_bm25_retrieval(self):
-        print(f'Performing BM25 Retrieval on {self.name}...')
-        bm25 = pt.BatchRetrieve(self.index, wmodel="BM25")
-        result_lines = []
-        for topic in tqdm(self.benchmark.topics):
-            rtr = bm25.search("".join([x if x.isalnum() else " " for x in topic.get_benchmark_string()]))
-            scored_docs = []
-            for index, row in rtr.iterrows():
-                scored_docs.append((row["docno"], row["score"]))
-            scored_docs = sorted(scored_docs, key=lambda x: x[1], reverse=True)
-            scored_docs = scored_docs[:BM25_RANKED_DOCUMENT_CUTOFF]
-
-            max_score = scored_docs[0][1]
-            rank = 0
-            for doc, score in scored_docs:
-                norm_score = score / max_score
-                result_lines.append(f'{topic.query_id}\tQ0\t{doc}\t{rank + 1}\t{norm_score}\tBM25')
-                rank += 1
+    def create_sharded_index(self, workers: int, stemmer: str, stopwords: str):
+        """
+        Builds index shards over document id ranges in parallel processes and merges them into the index
+        :param workers: number of shards (and worker processes)
+        """
+        shard_dir = f'{self.path}_shards'
+        tasks = [(BENCHMARKS.index(self.benchmark), os.path.join(shard_dir, f'shard_{shard}'), id_ranges,
+                  stemmer, stopwords)
+                 for shard, id_ranges in enumerate(self.get_id_ranges(workers))]
+        print(f'Building {len(tasks)} index shards with {workers} processes in {shard_dir}')
+        # every worker starts its own JVM (the JVM does not survive a fork)
+        with multiprocessing.get_context('spawn').Pool(processes=workers) as pool:
+            shard_paths = [p for p in pool.map(_build_index_shard, tasks, chunksize=1) if p is not None]
+        if not shard_paths:
+            raise ValueError(f'No documents found for {self.name}')
+        print(f'Merging {len(shard_paths)} index shards into {self.path}')
+        self.index = BenchmarkIndex.merge_indexes(shard_paths, self.path)
+        shutil.rmtree(shard_dir)
+        # shards only check the uniqueness of the source ids within their id ranges
+        duplicates = BenchmarkIndex.find_duplicate_documents(self.path)
+        if duplicates:
+            raise ValueError(f'{len(duplicates)} documents are indexed more than once in {self.path} '
+                             f'(e.g., {sorted(duplicates)[:10]})')
+
+    def create_index(self, stemmer="EnglishSnowballStemmer", stopwords="terrier", workers: int = 1):
+        print(f'Create index {self.path} (collections = {self.benchmark.document_collections})')
+        if workers > 1:
+            self.create_sharded_index(workers, stemmer, stopwords)
+        else:
+            self.index = BenchmarkIndex.index_documents(self.path, self.iterate_documents(), stemmer, stopwords)
+        # maximum resident set size of this process (including the JVM) and of the largest worker in KB on Linux
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        peak_worker_memory = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        print(f'Finished! (peak memory: {peak_memory:.1f} MB, largest worker: {peak_worker_memory:.1f} MB)')
+
+    def filter_baseline(self, rtr: pd.DataFrame) -> pd.DataFrame:
+        """
+        Removes the retrieved PubMed documents that are not part of the benchmark baseline
+        :param rtr: retrieval results with the docno and collection of each document
+        :return: the filtered results
+        """
+        baseline = self.benchmark.get_documents_for_baseline()
+        if not baseline:
+            return rtr
+        is_pubmed = rtr["collection"] == 'PubMed'
+        keep = ~is_pubmed
+        keep[is_pubmed] = rtr.loc[is_pubmed, "docno"].astype(np.int64).isin(baseline)
+        return rtr[keep]
+
+    def retrieve_from_master_index(self, topics: pd.DataFrame, threads: int = 1) -> pd.DataFrame:
+        """
+        Retrieves the topics from the master index with iterative deepening: topics that have less than
+        BM25_RANKED_DOCUMENT_CUTOFF documents in the baseline are retrieved again with a larger depth
+        :param topics: a DataFrame of topics (qid, query)
+        :param threads: number of threads that Terrier uses to retrieve the topics in parallel
+        :return: the retrieval results of all topics that pass the baseline filter
+        """
+        results = []
+        depth = BM25_RANKED_DOCUMENT_CUTOFF
+        while len(topics) > 0:
+            bm25 = pt.BatchRetrieve(self.index, wmodel="BM25", num_results=depth, threads=threads,
+                                    metadata=["docno", "collection"])
+            rtr = bm25.transform(topics)
+            no_retrieved = rtr.groupby("qid").size().reindex(topics["qid"], fill_value=0)
+            rtr = self.filter_baseline(rtr)
+            no_filtered = rtr.groupby("qid").size().reindex(topics["qid"], fill_value=0)
+
+            # a topic is finished if enough documents remain or all matching documents were retrieved
+            finished = ((no_filtered >= BM25_RANKED_DOCUMENT_CUTOFF) | (no_retrieved < depth)).to_numpy()
+            finished_qids = set(topics["qid"][finished])
+            results.append(rtr[rtr["qid"].isin(finished_qids)])
+            topics = topics[~finished]
+            if len(topics) > 0:
+                depth *= BM25_DEEPENING_FACTOR
+                print(f'Retrieving {len(topics)} topics again with depth {depth}')
+        return pd.concat(results, ignore_index=True)
+
+    def perform_bm25_retrieval(self, threads: int = 1):
+        """
+        Retrieves the top documents of all topics with BM25 in a single batch and writes them as baseline run
+        :param threads: number of threads that Terrier uses to retrieve the topics in parallel
+        """
+        print(f'Performing BM25 Retrieval on {self.name} ({len(self.benchmark.topics)} topics, {threads} threads)...')
+        topics = pd.DataFrame([[str(topic.query_id), "".join([x if x.isalnum() else " "
+                                                               for x in topic.get_benchmark_string()])]
+                               for topic in self.benchmark.topics], columns=["qid", "query"])
+        if self.use_master_index:
+            rtr = self.retrieve_from_master_index(topics, threads)
+        else:
+            bm25 = pt.BatchRetrieve(self.index, wmodel="BM25", num_results=BM25_RANKED_DOCUMENT_CUTOFF,
+                                    threads=threads)
+            rtr = bm25.transform(topics)
+
+        # keep the topic order of the benchmark and the rank order of each topic
+        qid2position = {qid: position for position, qid in enumerate(topics["qid"])}
+        rtr["position"] = rtr["qid"].map(qid2position)
+        rtr = rtr.sort_values(["position", "rank"], kind="stable")
+        rtr = rtr.groupby("qid", sort=False).head(BM25_RANKED_DOCUMENT_CUTOFF)
+
+        norm_scores = rtr["score"] / rtr.groupby("qid", sort=False)["score"].transform("max")
+        ranks = rtr.groupby("qid", sort=False).cumcount() + 1
+        result_lines = (rtr["qid"] + '\tQ0\t' + rtr["docno"].astype(str) + '\t' + ranks.astype(str) + '\t'
+                        + norm_scores.astype(str) + '\tBM25')
 
         result_file_path = os.path.join(RESULT_DIR_BASELINES, f'{self.name}_BM25.txt')
-        print(f'Writing results to {result_file_path}')
+        print(f'Writing {len(result_lines)} results to {result_file_path}')
         with open(result_file_path, 'wt') as f:
-            f.write('\n'.join([l for l in result_lines]))
+            f.write('\n'.join(result_lines.tolist()))
         print('Finished')
 
 
 def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes that build index shards in parallel (default: 1)")
+    parser.add_argument("--append", action="store_true",
+                        help="index documents that are missing in existing indexes (see config.INDEX_APPEND_MODE)")
+    args = parser.parse_args()
+
     if not pt.started():
         pt.init()
     for benchmark in tqdm(BENCHMARKS):
-        index = BenchmarkIndex(benchmark)
+        index = BenchmarkIndex(benchmark, workers=args.workers, append=args.append)
 
 
 if __name__ == '__main__':
@@ -1,5 +1,6 @@
 from collections import defaultdict
 
+import numpy as np
 from kgextractiontoolbox.document.narrative_document import NarrativeDocument
 from narrant.cleaning.pharmaceutical_vocabulary import SYMMETRIC_PREDICATES
 
@@ -42,6 +43,15 @@ class AnalyzedNarrativeDocument:
         self.spo2frequency = None
         self.max_statement_frequency = 0
         self.graph = None
+        # interned statements and their average sentence weights (see get_sentence_weight)
+        self.spo2index = None
+        self.spo_sentence_weights = None
+        # see rankers/neighbour_index.py and rankers/connectivity_index.py (depend on the prepared graph)
+        self.neighbour_index = None
+        self.connectivity_index = None
+        # memoized tf-idf scores (see BaseDocumentRanker.get_tf_idf and get_concept_tf_idf)
+        self.concept2tf_idf = {}
+        self.spo2tf_idf = {}
 
     def get_concept_relative_text_position(self, concept):
         # for problematic cases
@@ -78,6 +88,10 @@ class AnalyzedNarrativeDocument:
         self.sentence2spo = dict()
         self.spo2frequency = dict()
         self.graph = set()
+        self.neighbour_index = None
+        self.connectivity_index = None
+        self.concept2tf_idf = {}
+        self.spo2tf_idf = {}
         for statement in filter(lambda s: s.confidence >= min_confidence, self.document.extracted_statements):
             self.so2statement[(statement.subject_id, statement.object_id)].append(statement)
             self.so2statement[(statement.object_id, statement.subject_id)].append(statement)
@@ -117,6 +131,19 @@ class AnalyzedNarrativeDocument:
         # spo2frequency could be emtpy, take 0.0 in that case
         self.max_statement_frequency = 0.0 if not self.spo2frequency else max(self.spo2frequency.values())
 
+        # a sentence with n statements gives each statement the weight 1 / n
+        # the weight of a statement is the average weight of its sentences
+        self.spo2index = dict()
+        sentence_weights = []
+        for spo, sentences in self.spo2sentences.items():
+            self.spo2index[spo] = len(sentence_weights)
+            statement_weights = [1.0 / len(self.sentence2spo[sentence]) for sentence in sentences]
+            sentence_weights.append(sum(statement_weights) / len(statement_weights))
+        self.spo_sentence_weights = np.array(sentence_weights, dtype=np.float64)
+
+    def get_sentence_weight(self, spo: tuple) -> float:
+        return float(self.spo_sentence_weights[self.spo2index[spo]])
+
     def get_length_in_words(self):
         text = self.get_text()
         return len(text.split(' '))
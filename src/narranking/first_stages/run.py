@@ -7,6 +7,7 @@ from tqdm import tqdm
 
 from narraplay.documentranking.config import RESULT_DIR_FIRST_STAGE, MINIMUM_TRANSLATION_THRESHOLD
 from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.provenance_store import ProvenanceStore
 from narraplay.documentranking.run_config import CONCEPT_STRATEGIES, BENCHMARKS, FIRST_STAGES, FIRST_STAGE_CUTOFF, \
     MINIMUM_COMPONENTS_IN_QUERY
 
@@ -84,10 +85,9 @@ def main():
                     json.dump(statistics_data, f, indent=2)
                 print('--' * 60)
 
-                path = os.path.join(result_dir, f'{bench.name}_{stage.name}_{concept_strategy}_pos2prov.json')
+                path = os.path.join(result_dir, f'{bench.name}_{stage.name}_{concept_strategy}_pos2prov')
                 print(f'Write pos2prov to {path}')
-                with open(path, 'wt') as f:
-                    json.dump(pos2prov_collection_dict, f, indent=2)
+                ProvenanceStore.write(path, pos2prov_collection_dict)
                 print('--' * 60)
 
 
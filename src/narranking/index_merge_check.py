@@ -0,0 +1,138 @@
+import argparse
+import os
+import random
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyterrier as pt
+
+from narraplay.documentranking.create_document_index import BenchmarkIndex
+from narraplay.documentranking.rankers.bm25_index_manager import get_delta_index_paths
+
+STEMMER = "EnglishSnowballStemmer"
+STOPWORDS = "terrier"
+# maximum absolute BM25 score difference between two indexes
+MAX_SCORE_DIFFERENCE = 1e-6
+
+VOCABULARY = ["metformin", "diabetes", "insulin", "cancer", "tumor", "melanoma", "braf", "mutation", "therapy",
+              "patient", "treatment", "inhibitor", "kinase", "resistance", "protein", "expression", "cell", "growth",
+              "receptor", "gene", "clinical", "trial", "response", "survival", "dose", "drug", "the", "of", "and"]
+# append modes of consecutive appends (e.g., appending twice in merge mode or merging existing delta indexes)
+APPEND_MODES = [["merge", "merge"], ["delta", "delta", "merge"], ["delta", "merge", "merge"]]
+QUERIES = ["metformin diabetes", "braf mutation melanoma", "kinase inhibitor resistance", "tumor growth therapy",
+           "clinical trial survival"]
+
+
+def create_toy_collection(no_documents: int, seed: int = 42) -> list:
+    """
+    :return: a list of dictionaries with the docno, collection and text of random documents
+    """
+    rnd = random.Random(seed)
+    return [{'docno': str(docno), 'collection': 'Toy',
+             'text': ' '.join(rnd.choices(VOCABULARY, k=rnd.randint(5, 60)))}
+            for docno in range(no_documents)]
+
+
+def get_statistics(index_ref) -> tuple:
+    statistics = pt.IndexFactory.of(index_ref).getCollectionStatistics()
+    return (statistics.getNumberOfDocuments(), statistics.getNumberOfTokens(), statistics.getNumberOfUniqueTerms(),
+            statistics.getNumberOfPointers())
+
+
+def retrieve(index_ref) -> pd.DataFrame:
+    topics = pd.DataFrame([[str(qid), query] for qid, query in enumerate(QUERIES)], columns=["qid", "query"])
+    bm25 = pt.BatchRetrieve(index_ref, wmodel="BM25", num_results=1000)
+    return bm25.transform(topics).sort_values(["qid", "rank"])[["qid", "docno", "score"]].reset_index(drop=True)
+
+
+def compare_indexes(name: str, expected_ref, index_ref) -> bool:
+    """
+    Compares the collection statistics and a BM25 run of an index with the expected index
+    :return: whether both indexes agree
+    """
+    expected_statistics, statistics = get_statistics(expected_ref), get_statistics(index_ref)
+    expected_run, run = retrieve(expected_ref), retrieve(index_ref)
+    same_ranking = expected_run[["qid", "docno"]].equals(run[["qid", "docno"]])
+    max_difference = float(np.max(np.abs(expected_run["score"] - run["score"]))) if same_ranking else float('inf')
+    print(f'{name}: statistics {statistics} (expected {expected_statistics}) / same ranking: {same_ranking} / '
+          f'max |score difference| = {max_difference}')
+    return statistics == expected_statistics and same_ranking and max_difference <= MAX_SCORE_DIFFERENCE
+
+
+def check_sharded_index(directory: str, documents: list, shards: int) -> bool:
+    """
+    Checks that merged index shards are equivalent to an index that is built over all documents at once
+    """
+    expected_ref = BenchmarkIndex.index_documents(os.path.join(directory, 'monolithic'), documents,
+                                                  STEMMER, STOPWORDS)
+    shard_paths = []
+    for shard, shard_documents in enumerate(np.array_split(np.array(documents, dtype=object), shards)):
+        shard_paths.append(os.path.join(directory, f'shard_{shard}'))
+        BenchmarkIndex.index_documents(shard_paths[-1], list(shard_documents), STEMMER, STOPWORDS)
+    index_ref = BenchmarkIndex.merge_indexes(shard_paths, os.path.join(directory, 'merged'))
+    if not all(os.path.isdir(p) for p in shard_paths):
+        print('Merging removed an index shard')
+        return False
+    return compare_indexes(f'{shards} merged shards', expected_ref, index_ref)
+
+
+def check_appended_index(directory: str, documents: list, modes: list) -> bool:
+    """
+    Checks that an index with appended documents is equivalent to an index that is built over all documents at once
+    :param modes: the append mode of each append, ending with "merge" (the documents are split into
+                  len(modes) + 1 parts)
+    """
+    expected_ref = BenchmarkIndex.index_documents(os.path.join(directory, 'monolithic'), documents,
+                                                  STEMMER, STOPWORDS)
+    parts = [list(part) for part in np.array_split(np.array(documents, dtype=object), len(modes) + 1)]
+    path = os.path.join(directory, 'appended')
+    BenchmarkIndex.index_documents(path, parts[0], STEMMER, STOPWORDS)
+    for mode, part in zip(modes, parts[1:]):
+        BenchmarkIndex.append_to_index(path, part, STEMMER, STOPWORDS, mode)
+    # the last append merges all delta indexes into the index
+    if get_delta_index_paths(path):
+        print('Merging kept delta indexes')
+        return False
+    return compare_indexes(f'appended ({", ".join(modes)})', expected_ref, path)
+
+
+def main():
+    """
+    Builds indexes over a toy collection and checks that merged and appended indexes equal a monolithic index
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=1000, help="number of toy documents")
+    parser.add_argument("--shards", type=int, nargs="+", default=[2, 3, 5], help="number of index shards")
+    args = parser.parse_args()
+
+    if not pt.started():
+        pt.init()
+
+    documents = create_toy_collection(args.documents)
+    failed = []
+    for shards in args.shards:
+        directory = tempfile.mkdtemp(prefix='index_merge_check_')
+        try:
+            if not check_sharded_index(directory, documents, shards):
+                failed.append(f'{shards} shards')
+        finally:
+            shutil.rmtree(directory)
+
+    for modes in APPEND_MODES:
+        directory = tempfile.mkdtemp(prefix='index_append_check_')
+        try:
+            if not check_appended_index(directory, documents, modes):
+                failed.append(f'append {modes}')
+        finally:
+            shutil.rmtree(directory)
+
+    if failed:
+        print(f'Merged indexes differ from the monolithic index: {failed}')
+        exit(1)
+    print('Merged indexes agree with the monolithic index')
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,49 @@
+import argparse
+import heapq
 import json
 import logging
+import multiprocessing
 import os.path
 from datetime import datetime
 
 from tqdm import tqdm
 
-from narraplay.documentranking.config import RESULT_DIR, RESULT_DIR_FIRST_STAGE
+from narraplay.documentranking.config import RESULT_DIR, RESULT_DIR_FIRST_STAGE, PYTERRIER_INDEX_PATH
 from narraplay.documentranking.corpus import DocumentCorpus
 from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.feature_engine import FragmentFeatureEngine
 from narraplay.documentranking.rankers.graph_fragment import GraphFragment
+from narraplay.documentranking.rankers.graph_matcher import QueryGraphMatcher
+from narraplay.documentranking.rankers.parallel_ranking import ShardedRankingExecutor
+from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
+from narraplay.documentranking.rankers.ranker_cache import RankerResultCache
 from narraplay.documentranking.rankers.ranker_weighted import run_weighted_ranker
+from narraplay.documentranking.rankers.registry import load_rankers, load_ranker
 from narraplay.documentranking.retriever import DocumentRetriever
 from narraplay.documentranking.run_config import BENCHMARKS, FIRST_STAGE_NAMES, CONCEPT_STRATEGIES, WEIGHT_MATRIX, \
-    RANKING_STRATEGIES, RANKER_BASES, IGNORE_DEMOGRAPHIC
+    RANKING_STRATEGIES, RANKER_SELECTIONS, RANKER_BASES, IGNORE_DEMOGRAPHIC, MAX_FRAGMENTS_PER_DOCUMENT, FRAGMENT_SOURCE, \
+    RANKING_WORKERS, RANKING_TOP_K, USE_RANKER_CACHE, FRAGMENT_UPPER_BOUND_RANKER, get_result_prefix
 
 logging.basicConfig(format='%(asctime)s,%(msecs)d %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s',
                     datefmt='%Y-%m-%d:%H:%M:%S',
                     level=logging.INFO)
 
-print('=' * 60)
-print(f'Demographic Ignored: {IGNORE_DEMOGRAPHIC}')
-print('=' * 60)
+# the selected rankers (see select_rankers)
+RANKERS = []
+
+
+def select_rankers(selection: [str]):
+    """
+    Loads the selected rankers
+    :param selection: ranker names or names of ranker selections in run_config.RANKER_SELECTIONS
+    :return: None
+    """
+    names = []
+    for name in selection:
+        for ranker_name in RANKER_SELECTIONS.get(name, [name]):
+            if ranker_name not in names:
+                names.append(ranker_name)
+    RANKERS[:] = load_rankers(names)
 
 
 def load_document_ids_from_runfile(path_to_runfile):
@@ -55,148 +78,368 @@ def compute_first_stage_scores(fs_docs_with_scores):
     return fs_doc_id2upper_bound, fs_doc_id2score_lower_bound
 
 
-for bench in tqdm(BENCHMARKS):
-    # set the current benchmark for all rankers
-    for ranker in RANKING_STRATEGIES:
+def create_fragment_upper_bound(corpus: DocumentCorpus):
+    """
+    :return: the statement upper bound function of run_config.FRAGMENT_UPPER_BOUND_RANKER or None if not configured
+    """
+    if not FRAGMENT_UPPER_BOUND_RANKER:
+        return None
+    ranker = load_ranker(FRAGMENT_UPPER_BOUND_RANKER)
+    if type(ranker).get_statement_upper_bound is BaseDocumentRanker.get_statement_upper_bound:
+        raise ValueError(f'{ranker.name} does not provide statement upper bounds')
+    return lambda document, spo: ranker.get_statement_upper_bound(document, corpus, spo)
+
+
+def load_fragment_source(bench, first_stage: str, concept_strategy: str, corpus: DocumentCorpus):
+    fragment_upper_bound = create_fragment_upper_bound(corpus)
+    if FRAGMENT_SOURCE == "matcher":
+        # derive fragments directly from the document graphs
+        return QueryGraphMatcher(partial_match="Partial" in first_stage,
+                                 max_fragments_per_document=MAX_FRAGMENTS_PER_DOCUMENT,
+                                 fragment_upper_bound=fragment_upper_bound)
+    # load the provenance of the first stage once for all topics
+    gf_path = os.path.join(RESULT_DIR_FIRST_STAGE, f'{bench.name}_{first_stage}_{concept_strategy}_pos2prov.json')
+    return GraphFragment(gf_path, max_fragments_per_document=MAX_FRAGMENTS_PER_DOCUMENT,
+                         fragment_upper_bound=fragment_upper_bound)
+
+
+def create_ranker_cache(bench, first_stage: str, concept_strategy: str, corpus: DocumentCorpus):
+    if not USE_RANKER_CACHE:
+        return None
+    index_path = os.path.join(PYTERRIER_INDEX_PATH, bench.get_index_name())
+    return RankerResultCache(bench.name, first_stage, concept_strategy,
+                             data_values=RankerResultCache.get_data_values(corpus, index_path))
+
+
+def load_first_stage_documents(bench, first_stage: str, concept_strategy: str):
+    topic2ids = {}
+    if first_stage != ["GivenByBenchmark"]:
+        path = os.path.join(RESULT_DIR_FIRST_STAGE, f'{bench.name}_{first_stage}_{concept_strategy}.txt')
+        topic2ids = load_document_ids_from_runfile(path)
+    return topic2ids
+
+
+def rank_topic(bench, first_stage: str, concept_strategy: str, q, topic2ids: dict, corpus: DocumentCorpus,
+               retriever: DocumentRetriever, gf, executor: ShardedRankingExecutor = None,
+               cache: RankerResultCache = None):
+    """
+    Ranks the first stage documents of a single topic with all ranking strategies
+    (rankers with cached results for this topic are skipped)
+    :return: the query statistics, a dictionary mapping each ranker name to its result lines and the number of
+             ranked documents
+    """
+    print('--' * 60)
+    print(f'Evaluating query {q}')
+    print(f'Query components: {list(q.get_query_components())}')
+    analyzed_query = AnalyzedQuery(q, concept_strategy=concept_strategy)
+    analyzed_query_statistics = analyzed_query.get_statistics()
+
+    if first_stage == "GivenByBenchmark":
+        # every document has the perfect score
+        fs_docs_with_scores = [(d, 1.0) for d in bench.topic_id2docs[q.query_id]]
+    else:
+        if int(q.query_id) in topic2ids:
+            fs_docs_with_scores = topic2ids[int(q.query_id)]
+        else:
+            fs_docs_with_scores = list()
+
+    fs_doc_ids = [d[0] for d in fs_docs_with_scores]
+    # Get lower and upper bound of document ids scores
+    fs_doc_id2upper_bound, fs_doc_id2lower_bound = compute_first_stage_scores(fs_docs_with_scores)
+    # the first stage adjustment below preserves the ranking order if all documents share the same first stage
+    # score, so the rankers only have to return the best k documents
+    ranker_top_k = RANKING_TOP_K if len(set(fs_doc_id2upper_bound.values())) == 1 else 0
+
+    rankers = RANKERS
+    ranker2result_lines = {}
+    if cache:
+        topic_key = RankerResultCache.get_topic_key(fs_docs_with_scores, analyzed_query)
+        for ranker in RANKERS:
+            result_lines = cache.load_result_lines(q.query_id, topic_key, ranker)
+            if result_lines is not None:
+                ranker2result_lines[ranker.name] = result_lines
+        rankers = [r for r in RANKERS if r.name not in ranker2result_lines]
+
+        cached_statistics = cache.load_topic_statistics(q.query_id, topic_key)
+        if not rankers and cached_statistics:
+            print(f'Reusing cached results of all {len(ranker2result_lines)} rankers')
+            return cached_statistics["statistics"], ranker2result_lines, cached_statistics["no_documents"]
+        print(f'Reusing cached results of {len(ranker2result_lines)} rankers ({len(rankers)} to compute)')
+
+    print(f'Querying for {len(fs_docs_with_scores)} documents...')
+    narrative_docs = list(retriever.retrieve_narrative_documents_for_collections(fs_doc_ids,
+                                                                                 bench.document_collections))
+    narrative_docs = sorted(narrative_docs, key=lambda x: x.document_id_source)
+    for d in narrative_docs:
+        d.prepare_with_min_confidence()
+
+    analyzed_query_statistics.update(analyzed_query.get_document_statistics(narrative_docs))
+
+    # compute matching fragments
+    gf.enumerator.reset_statistics()
+    fragments = gf.matches_many(analyzed_query, narrative_docs)
+    print(f'{gf.enumerator.yielded_fragments} fragments enumerated '
+          f'({gf.enumerator.pruned_fragments} pruned)')
+
+    print(f'{len(narrative_docs)} documents retrieved')
+
+    if len(narrative_docs) > 0:
+        # base quantities are shared by all rankers
+        features = FragmentFeatureEngine.compute_many(analyzed_query, narrative_docs, corpus, fragments)
+        print('--' * 60)
+        ranker2ranked_docs = {}
+        if executor:
+            # fragment-based rankers score shards of the documents in worker processes
+            start = datetime.now()
+            ranker2ranked_docs = executor.rank_documents(rankers, analyzed_query,
+                                                         narrative_docs, corpus, fragments, features,
+                                                         top_k=ranker_top_k)
+            time_taken = datetime.now() - start
+            print(f'{time_taken}s to compute {len(ranker2ranked_docs)} rankers '
+                  f'with {executor.workers} workers')
+        for ranker in rankers:
+            start = datetime.now()
+            result_lines = []
+            if ranker.name in ranker2ranked_docs:
+                ranked_docs = ranker2ranked_docs[ranker.name]
+            else:
+                ranked_docs = ranker.rank_documents(analyzed_query, narrative_docs, corpus, fragments,
+                                                    features, top_k=ranker_top_k)
+            ranked_docs_adjusted = []
+            if len(ranked_docs) > 0:
+                for rank, (doc_id, score) in enumerate(ranked_docs):
+                    fs_max = fs_doc_id2upper_bound[str(doc_id)]
+                    # to differentiate between different intervalls, add 0.01
+                    fs_min = fs_doc_id2lower_bound[str(doc_id)] + 0.01
+                    fs_range = fs_max - fs_min
+
+                    if fs_min > fs_max or fs_min < 0.0 or fs_max > 1.0 or fs_range < 0.0 or fs_range > 1.0:
+                        raise ValueError(
+                            f'First stage score computation yielded an error:{fs_min} {fs_max} {fs_range}')
+
+                    norm_score = fs_min + score * fs_range
+                    if norm_score > 1.0 or norm_score < 0.0:
+                        raise ValueError(
+                            f'Document {doc_id} received a score not in [0, 1] (score = {norm_score} / ranker = {ranker.name})')
+
+                    ranked_docs_adjusted.append((doc_id, norm_score))
+
+                if 0 < RANKING_TOP_K < len(ranked_docs_adjusted):
+                    # only the best k documents are written (same order as the full sort)
+                    ranked_docs_adjusted = heapq.nlargest(RANKING_TOP_K, ranked_docs_adjusted,
+                                                          key=lambda x: (x[1], x[0]))
+                else:
+                    ranked_docs_adjusted.sort(key=lambda x: (x[1], x[0]), reverse=True)
+                for rank, (doc_id, norm_score) in enumerate(ranked_docs_adjusted):
+                    result_line = f'{q.query_id}\tQ0\t{doc_id}\t{rank + 1}\t{norm_score}\t{ranker.name}'
+                    result_lines.append(result_line)
+
+            time_taken = datetime.now() - start
+            print(f'{time_taken}s to compute {ranker.name}')
+
+            ranker2result_lines[ranker.name] = result_lines
+
+    # topics without documents have no result lines
+    for ranker in rankers:
+        result_lines = ranker2result_lines.setdefault(ranker.name, [])
+        if cache:
+            cache.store_result_lines(q.query_id, topic_key, ranker, result_lines)
+    if cache:
+        cache.store_topic_statistics(q.query_id, topic_key, analyzed_query_statistics, len(narrative_docs))
+
+    return analyzed_query_statistics, ranker2result_lines, len(narrative_docs)
+
+
+# warm state of a topic worker process (one benchmark per pool)
+_WORKER_STATE = {}
+
+
+def _init_topic_worker(bench_idx: int, ranker_names: [str]):
+    select_rankers(ranker_names)
+    bench = BENCHMARKS[bench_idx]
+    for ranker in RANKERS:
         ranker.set_benchmark(bench)
-    corpus_collections = [c for c in bench.document_collections]
-   # if "PubMed" not in corpus_collections:
-   #     corpus_collections.append("PubMed")
-    corpus = DocumentCorpus(collections=corpus_collections)
-    retriever = DocumentRetriever()
+    _WORKER_STATE["bench"] = bench
+    _WORKER_STATE["corpus"] = DocumentCorpus(collections=[c for c in bench.document_collections])
+    _WORKER_STATE["retriever"] = DocumentRetriever()
+    _WORKER_STATE["runs"] = {}
+
+
+def _rank_topic_in_worker(task):
+    first_stage, concept_strategy, topic_idx = task
+    bench = _WORKER_STATE["bench"]
+    # first stage results and fragment sources are loaded once per worker (only the current run is kept)
+    key = (first_stage, concept_strategy)
+    if key not in _WORKER_STATE["runs"]:
+        _WORKER_STATE["runs"] = {key: (load_first_stage_documents(bench, first_stage, concept_strategy),
+                                       load_fragment_source(bench, first_stage, concept_strategy,
+                                                            _WORKER_STATE["corpus"]),
+                                       create_ranker_cache(bench, first_stage, concept_strategy,
+                                                           _WORKER_STATE["corpus"]))}
+    topic2ids, gf, cache = _WORKER_STATE["runs"][key]
+    # topics are already distributed across processes, so rank the documents of a topic sequentially
+    return rank_topic(bench, first_stage, concept_strategy, bench.topics[topic_idx], topic2ids,
+                      _WORKER_STATE["corpus"], _WORKER_STATE["retriever"], gf, cache=cache)
+
+
+def write_results(bench, first_stage: str, concept_strategy: str, ranker2result_lines: dict,
+                  statistics_data: list):
+    prefix = get_result_prefix(first_stage, concept_strategy)
+    stats_dir = os.path.join(RESULT_DIR, 'statistics')
+    if not os.path.exists(stats_dir):
+        os.makedirs(stats_dir)
+
+    result_dir = os.path.join(RESULT_DIR, prefix)
+    if not os.path.exists(result_dir):
+        os.makedirs(result_dir)
+
+    print('--' * 60)
+    print('Writing result files...')
+    for r in RANKERS:
+        results = ranker2result_lines[r.name]
+        path = os.path.join(result_dir, f'{bench.name}_{r.name}.txt')
+        with open(path, 'wt') as f:
+            f.write('\n'.join(results))
+
+    # Execute the weighted ranker (only for ranker bases whose result files were written by this run)
+    print('--' * 60)
+    ranker_names = {r.name for r in RANKERS}
+    ranker_bases = [base for base in RANKER_BASES if all(name in ranker_names for name in base)]
+    if RANKING_TOP_K > 0:
+        # the fusion requires the scores of all documents in every ranker
+        print(f'Skipping weighted rankers (result files are truncated to the top {RANKING_TOP_K} documents)')
+    elif ranker_bases:
+        print(f'Executing weighted rankers ({len(ranker_bases)} of {len(RANKER_BASES)} ranker bases)...')
+        run_weighted_ranker(benchmark=bench, weight_matrix=WEIGHT_MATRIX, ranker_bases=ranker_bases,
+                            strategy=concept_strategy, first_stage=first_stage)
+    else:
+        print('Skipping weighted rankers (the selected rankers do not cover a ranker base)')
+
+    path = os.path.join(stats_dir, f'{bench.name}_{prefix}.json')
+    with open(path, 'wt') as f:
+        statistics = dict()
+        for obj in statistics_data:
+            cnt = 0
+            for _, concepts in obj["component2concepts"].items():
+                length = len(concepts)
+                if length > 0:
+                    cnt += 1
+            if cnt not in statistics:
+                statistics[cnt] = 0
+            statistics[cnt] += 1
+
+        json.dump(dict(data=statistics_data, statistics=statistics), f, indent=2)
+    print('--' * 60)
+
+
+def run_benchmark(bench, workers: int = 1):
+    """
+    Ranks all topics of a benchmark for every first stage and concept strategy
+    :param bench: the benchmark
+    :param workers: number of topic worker processes (<= 1 = rank the topics in this process)
+    :return: None
+    """
     print('==' * 60)
     print('==' * 60)
     print(f'Running benchmark: {bench}')
     print('==' * 60)
     print('==' * 60)
-    for first_stage in FIRST_STAGE_NAMES:
-        print('--' * 60)
-        print(f'Running with first stage: {first_stage}')
-        print('--' * 60)
-        for concept_strategy in CONCEPT_STRATEGIES:
-            prefix = first_stage + '_' + concept_strategy
-            stats_dir = os.path.join(RESULT_DIR, 'statistics')
-            if not os.path.exists(stats_dir):
-                os.makedirs(stats_dir)
-
-            result_dir = os.path.join(RESULT_DIR, prefix)
-            if not os.path.exists(result_dir):
-                os.makedirs(result_dir)
-
-            statistics_data = []
-            topic2ids = {}
-            if first_stage != ["GivenByBenchmark"]:
-                path = os.path.join(RESULT_DIR_FIRST_STAGE, f'{bench.name}_{first_stage}_{concept_strategy}.txt')
-                topic2ids = load_document_ids_from_runfile(path)
-
-            ranker2result_lines = {}
-            for idx, q in enumerate(bench.topics):
-                print('--' * 60)
-                print(f'Evaluating query {q}')
-                print(f'Query components: {list(q.get_query_components())}')
-                analyzed_query = AnalyzedQuery(q, concept_strategy=concept_strategy)
-                analyzed_query_statistics = analyzed_query.get_statistics()
-
-                if first_stage == "GivenByBenchmark":
-                    # every document has the perfect score
-                    fs_docs_with_scores = [(d, 1.0) for d in bench.topic_id2docs[q.query_id]]
-                else:
-                    if int(q.query_id) in topic2ids:
-                        fs_docs_with_scores = topic2ids[int(q.query_id)]
-                    else:
-                        fs_docs_with_scores = list()
-
-                fs_doc_ids = [d[0] for d in fs_docs_with_scores]
-                # Get lower and upper bound of document ids scores
-                fs_doc_id2upper_bound, fs_doc_id2lower_bound = compute_first_stage_scores(fs_docs_with_scores)
-
-                print(f'Querying for {len(fs_docs_with_scores)} documents...')
-                narrative_docs = list(retriever.retrieve_narrative_documents_for_collections(fs_doc_ids,
-                                                                                             bench.document_collections))
-                narrative_docs = sorted(narrative_docs, key=lambda x: x.document_id_source)
-                for d in narrative_docs:
-                    d.prepare_with_min_confidence()
-
-                analyzed_query_statistics.update(analyzed_query.get_document_statistics(narrative_docs))
-                statistics_data.append(analyzed_query_statistics)
-
-                # compute matching fragments
-                gf_path = os.path.join(RESULT_DIR_FIRST_STAGE,
-                                       f'{bench.name}_{first_stage}_{concept_strategy}_pos2prov.json')
-                gf = GraphFragment(gf_path)
-                fragments = list(gf.matches(analyzed_query, doc) for doc in narrative_docs)
-
-                print(f'{len(narrative_docs)} documents retrieved')
-
-                if len(narrative_docs) > 0:
-                    print('--' * 60)
-                    for ranker in RANKING_STRATEGIES:
-                        if ranker.name not in ranker2result_lines:
-                            ranker2result_lines[ranker.name] = list()
-                        start = datetime.now()
-                        result_lines = []
-                        ranked_docs = ranker.rank_documents(analyzed_query, narrative_docs, corpus, fragments)
-                        ranked_docs_adjusted = []
-                        if len(ranked_docs) > 0:
-                            for rank, (doc_id, score) in enumerate(ranked_docs):
-                                fs_max = fs_doc_id2upper_bound[str(doc_id)]
-                                # to differentiate between different intervalls, add 0.01
-                                fs_min = fs_doc_id2lower_bound[str(doc_id)] + 0.01
-                                fs_range = fs_max - fs_min
-
-                                if fs_min > fs_max or fs_min < 0.0 or fs_max > 1.0 or fs_range < 0.0 or fs_range > 1.0:
-                                    raise ValueError(
-                                        f'First stage score computation yielded an error:{fs_min} {fs_max} {fs_range}')
-
-                                norm_score = fs_min + score * fs_range
-                                if norm_score > 1.0 or norm_score < 0.0:
-                                    raise ValueError(
-                                        f'Document {doc_id} received a score not in [0, 1] (score = {norm_score} / ranker = {ranker.name})')
-
-                                ranked_docs_adjusted.append((doc_id, norm_score))
-
-                            ranked_docs_adjusted.sort(key=lambda x: (x[1], x[0]), reverse=True)
-                            for rank, (doc_id, norm_score) in enumerate(ranked_docs_adjusted):
-                                result_line = f'{q.query_id}\tQ0\t{doc_id}\t{rank + 1}\t{norm_score}\t{ranker.name}'
-                                result_lines.append(result_line)
-
-                        time_taken = datetime.now() - start
-                        print(f'{time_taken}s to compute {ranker.name}')
-
-                        ranker2result_lines[ranker.name].extend(result_lines)
 
+    pool = None
+    executor = None
+    if workers > 1:
+        # workers are started with spawn (the JVM of the BM25 rankers does not survive a fork) and keep their
+        # retriever, corpus and tagger state warm for all first stages and concept strategies of the benchmark
+        bench_idx = BENCHMARKS.index(bench)
+        pool = multiprocessing.get_context('spawn').Pool(processes=workers, initializer=_init_topic_worker,
+                                                         initargs=(bench_idx, [r.name for r in RANKERS]))
+    else:
+        # set the current benchmark for all rankers
+        for ranker in RANKERS:
+            ranker.set_benchmark(bench)
+        corpus_collections = [c for c in bench.document_collections]
+        corpus = DocumentCorpus(collections=corpus_collections)
+        retriever = DocumentRetriever()
+        if RANKING_WORKERS > 1:
+            # one pool of ranking workers for all topics of the benchmark
+            ranker_names = [r.name for r in RANKERS if ShardedRankingExecutor.is_fragment_ranker(r)]
+            executor = ShardedRankingExecutor(workers=RANKING_WORKERS, ranker_names=ranker_names,
+                                              collections=corpus_collections)
+
+    try:
+        for first_stage in FIRST_STAGE_NAMES:
             print('--' * 60)
-            print('Writing result files...')
-            for r in RANKING_STRATEGIES:
-                results = ranker2result_lines[r.name]
-                path = os.path.join(result_dir, f'{bench.name}_{r.name}.txt')
-                with open(path, 'wt') as f:
-                    f.write('\n'.join(results))
-
-            # Execute the weighted ranker
-            print('--' * 60)
-            print('Executing weighted rankers...')
-            run_weighted_ranker(benchmark=bench, weight_matrix=WEIGHT_MATRIX, ranker_bases=RANKER_BASES,
-                                strategy=concept_strategy, first_stage=first_stage)
-
-            path = os.path.join(stats_dir, f'{bench.name}_{prefix}.json')
-            with open(path, 'wt') as f:
-                statistics = dict()
-                for obj in statistics_data:
-                    cnt = 0
-                    for _, concepts in obj["component2concepts"].items():
-                        length = len(concepts)
-                        if length > 0:
-                            cnt += 1
-                    if cnt not in statistics:
-                        statistics[cnt] = 0
-                    statistics[cnt] += 1
-
-                json.dump(dict(data=statistics_data, statistics=statistics), f, indent=2)
+            print(f'Running with first stage: {first_stage}')
             print('--' * 60)
+            for concept_strategy in CONCEPT_STRATEGIES:
+                start = datetime.now()
+                if pool:
+                    tasks = [(first_stage, concept_strategy, idx) for idx in range(len(bench.topics))]
+                    # imap returns the results in topic order
+                    topic_results = pool.imap(_rank_topic_in_worker, tasks)
+                else:
+                    topic2ids = load_first_stage_documents(bench, first_stage, concept_strategy)
+                    gf = load_fragment_source(bench, first_stage, concept_strategy, corpus)
+                    cache = create_ranker_cache(bench, first_stage, concept_strategy, corpus)
+                    topic_results = (rank_topic(bench, first_stage, concept_strategy, q, topic2ids, corpus,
+                                                retriever, gf, executor=executor, cache=cache)
+                                     for q in bench.topics)
+
+                statistics_data = []
+                ranker2result_lines = {}
+                no_documents = 0
+                for analyzed_query_statistics, topic_result_lines, no_topic_documents in topic_results:
+                    statistics_data.append(analyzed_query_statistics)
+                    for ranker_name, result_lines in topic_result_lines.items():
+                        if ranker_name not in ranker2result_lines:
+                            ranker2result_lines[ranker_name] = list()
+                        ranker2result_lines[ranker_name].extend(result_lines)
+                    no_documents += no_topic_documents
+
+                time_taken = (datetime.now() - start).total_seconds()
+                print('--' * 60)
+                print(f'Ranked {len(bench.topics)} topics ({no_documents} documents) in {time_taken:.1f}s '
+                      f'with {max(workers, 1)} worker(s): {len(bench.topics) / max(time_taken, 1e-9):.2f} topics/s, '
+                      f'{no_documents / max(time_taken, 1e-9):.1f} documents/s')
+
+                write_results(bench, first_stage, concept_strategy, ranker2result_lines, statistics_data)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+        else:
+            if executor:
+                executor.close()
+            # indexes that are shared by the rankers are closed once all rankers released them
+            for ranker in RANKERS:
+                ranker.release_benchmark()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes that rank topics in parallel (default: 1)")
+    parser.add_argument("--rankers", nargs="+", default=RANKING_STRATEGIES,
+                        help="ranker names or ranker selections from run_config.RANKER_SELECTIONS "
+                             "(default: run_config.RANKING_STRATEGIES)")
+    args = parser.parse_args()
+    select_rankers(args.rankers)
+
+    print('=' * 60)
+    print(f'Demographic Ignored: {IGNORE_DEMOGRAPHIC}')
+    print(f'Topic workers: {args.workers}')
+    print(f'Rankers: {[r.name for r in RANKERS]}')
+    print('=' * 60)
+
+    for bench in tqdm(BENCHMARKS):
+        run_benchmark(bench, workers=args.workers)
+
 
 # Write results
 # results/benchmark_name/metric.txt
 # QueryTopic Bla Doc_ID Rang Score Metric.Name s
 
 # 1	Q0	v861kk0i	1	45602.81753540039	BioInfo-run1
+
+if __name__ == "__main__":
+    main()
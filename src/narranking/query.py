@@ -20,6 +20,8 @@ class AnalyzedQuery:
 
     def __init__(self, topic: Topic, concept_strategy, translate_query=True):
         self.topic = topic
+        # memoized translation scores of document fragments (see get_fragment_translation_score)
+        self.fragment2translation_score = dict()
 
         if not translate_query:
             return
@@ -84,6 +86,13 @@ class AnalyzedQuery:
             for c in self.concepts:
                 self.concept2score[c] = 1.0
 
+    def __getstate__(self):
+        # the taggers are only required to translate the query (e.g., queries are sent to ranking workers)
+        state = self.__dict__.copy()
+        state.pop("tagger", None)
+        state.pop("taggerV2", None)
+        return state
+
     def get_query_translation_score(self):
         # we did not translate all components
         if len(list(self.topic.get_query_components())) > len(self.component2concepts):
@@ -102,6 +111,20 @@ class AnalyzedQuery:
         else:
             return 1.0
 
+    def get_fragment_translation_score(self, fragment) -> float:
+        fragment = tuple(fragment)
+        if fragment not in self.fragment2translation_score:
+            # the fragment is only as good as it weakest translation
+            scores = []
+            for statement in fragment:
+                scores.append(self.concept2score[statement[0]])
+                scores.append(self.concept2score[statement[2]])
+
+            min_score = min(scores)
+            assert 0.0 <= min_score <= 1.0
+            self.fragment2translation_score[fragment] = min_score
+        return self.fragment2translation_score[fragment]
+
     def get_statistics(self):
         return dict(topic=str(self.topic), component2concepts=self.component2concepts)
 
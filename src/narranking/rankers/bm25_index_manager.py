@@ -0,0 +1,113 @@
+import glob
+import os
+from collections import Counter
+from typing import List
+
+from narraplay.documentranking.rankers.bm25_native import NativeBM25Index
+
+
+def get_delta_index_paths(index_path: str) -> List[str]:
+    """
+    :return: the paths of the delta indexes that were appended to an index (in the order of their creation)
+    """
+    paths = [p for p in glob.glob(f'{index_path}_delta_*') if os.path.isdir(p)]
+    return sorted(paths, key=lambda p: int(p.rsplit('_', 1)[1]))
+
+
+def open_index(index_path: str, memory: bool = False):
+    """
+    Opens a PyTerrier index together with its delta indexes
+    If delta indexes exist, a Terrier MultiIndex is returned that retrieves over all of them with the collection
+    statistics of the whole collection.
+    :param index_path: path of the PyTerrier index
+    :param memory: load the index onto the JVM heap
+    :return: the index
+    """
+    import pyterrier as pt
+    if not pt.started():
+        pt.init()
+    delta_paths = get_delta_index_paths(index_path)
+    if not delta_paths:
+        return pt.IndexFactory.of(index_path, memory=memory)
+    print(f'Open {index_path} with {len(delta_paths)} delta indexes')
+    indexes = [pt.IndexFactory.of(path, memory=memory) for path in [index_path] + delta_paths]
+    return pt.autoclass("org.terrier.realtime.multi.MultiIndex")(indexes)
+
+
+class BM25IndexManager:
+    """
+    Process-wide registry of the opened BM25 indexes
+
+    Each index is opened once and shared by all BM25 rankers of the process. PyTerrier indexes are read from
+    disk by default (Terrier reads the index structures on demand) and only loaded onto the JVM heap if a preload
+    is requested. Indexes are reference-counted: every acquire must be paired with a release, and an index is
+    closed as soon as the last ranker releases it (e.g., when a benchmark is finished).
+    The first acquire decides about the preload of an index.
+    """
+    __instance = None
+
+    @staticmethod
+    def instance():
+        if BM25IndexManager.__instance is None:
+            BM25IndexManager()
+        return BM25IndexManager.__instance
+
+    def __init__(self):
+        if BM25IndexManager.__instance is not None:
+            raise Exception('This class is a singleton - use BM25IndexManager.instance()')
+        self.__path2index = dict()
+        self.__path2references = Counter()
+        BM25IndexManager.__instance = self
+
+    def __acquire(self, path: str, load):
+        if path not in self.__path2index:
+            self.__path2index[path] = load()
+        self.__path2references[path] += 1
+        return self.__path2index[path]
+
+    def acquire(self, index_path: str, preload: bool = None):
+        """
+        Opens a PyTerrier index or returns the already opened instance
+        :param index_path: path of the PyTerrier index
+        :param preload: load the index onto the JVM heap (default: run_config.BM25_INDEX_PRELOAD)
+        :return: the PyTerrier index
+        """
+        if preload is None:
+            from narraplay.documentranking.run_config import BM25_INDEX_PRELOAD
+            preload = BM25_INDEX_PRELOAD
+
+        def load():
+            print(f'Load BM25 index from: {index_path} (preload = {preload})')
+            return open_index(index_path, memory=preload)
+
+        return self.__acquire(index_path, load)
+
+    def acquire_native(self, index_path: str, native_path: str) -> NativeBM25Index:
+        """
+        Loads the exported statistics of a PyTerrier index or returns the already loaded instance
+        :param index_path: path of the PyTerrier index
+        :param native_path: directory of the exported statistics
+        :return: the NativeBM25Index
+        """
+        return self.__acquire(native_path, lambda: NativeBM25Index.of(index_path, native_path))
+
+    def release(self, path: str):
+        """
+        Releases an index acquired before (the index is closed if it is not used anymore)
+        :param path: the path that was used to acquire the index
+        """
+        if self.__path2references[path] <= 0:
+            raise ValueError(f'BM25 index {path} has not been acquired')
+        self.__path2references[path] -= 1
+        if self.__path2references[path] == 0:
+            del self.__path2references[path]
+            index = self.__path2index.pop(path)
+            if not isinstance(index, NativeBM25Index):
+                index.close()
+            print(f'Released BM25 index: {path}')
+
+    def get_open_indexes(self) -> dict:
+        """
+        :return: a dictionary mapping the path of each opened index to its number of references
+        """
+        return dict(self.__path2references)
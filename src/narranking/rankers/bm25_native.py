@@ -0,0 +1,229 @@
+import json
+import os
+from array import array
+from collections import Counter
+from typing import List, Tuple
+
+import numpy as np
+from nltk.corpus import stopwords
+from nltk.stem import PorterStemmer
+from tqdm import tqdm
+
+# parameters of Terrier's BM25 weighting model (org.terrier.matching.models.BM25)
+BM25_K1 = 1.2
+BM25_B = 0.75
+BM25_K3 = 8.0
+# Terrier skips query terms that occur more often in the collection than there are documents
+IGNORE_LOW_IDF_TERMS = True
+# Terrier's tokeniser drops longer terms
+MAX_TERM_LENGTH = 20
+
+STOPWORDS = set(stopwords.words('english'))
+PORTER_STEMMER = PorterStemmer(mode=PorterStemmer.ORIGINAL_ALGORITHM)
+
+ARRAY_NAMES = ["doc_lengths", "docnos", "docno_docids", "terms", "term_ids", "term_df", "term_cf",
+               "dv_offsets", "dv_term_ids", "dv_tfs"]
+
+
+class NativeBM25Index:
+    """
+    JVM-free BM25 scorer for the candidate documents of a PyTerrier index
+
+    The collection statistics (number of documents, average document length, document lengths, document and
+    collection frequencies of the lexicon) and the term vectors of the direct index are exported once from the
+    PyTerrier index into NumPy arrays, which are memory-mapped when loaded.
+    Candidates are scored with Terrier's BM25 (k1 = 1.2, b = 0.75, k3 = 8, log2 idf) from their term vectors.
+
+    Queries are processed like Terrier's 'Stopwords,PorterStemmer' pipeline (lower case, stop words, original
+    Porter stemmer). Tolerance: scores agree with Terrier up to floating point rounding (relative error < 1e-6)
+    if the query terms are processed identically. Differences are possible because NLTK's stop word list is used
+    instead of Terrier's list: NLTK stop words that Terrier keeps (e.g., "don", "won" or "ma") are dropped although
+    they are part of the lexicon, and Terrier stop words that NLTK keeps only contribute if their stem collides with
+    an indexed term (they are not part of an index that is built with stopwords='terrier').
+    Use bm25_native_parity.py to measure the score differences and ranking changes on the benchmark topics.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'rt') as f:
+            self.meta = json.load(f)
+        self.no_documents = self.meta["no_documents"]
+        self.avg_doc_length = self.meta["avg_doc_length"]
+        for name in ARRAY_NAMES:
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r'))
+
+    @staticmethod
+    def get_index_version(index_path: str) -> float:
+        # Terrier rewrites its properties file whenever the index is (re)built
+        return os.path.getmtime(os.path.join(index_path, 'data.properties'))
+
+    @staticmethod
+    def is_exported(index_path: str, path: str) -> bool:
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.isfile(meta_path):
+            return False
+        with open(meta_path, 'rt') as f:
+            meta = json.load(f)
+        return meta["index_version"] == NativeBM25Index.get_index_version(index_path)
+
+    @staticmethod
+    def of(index_path: str, path: str):
+        """
+        Loads the exported statistics of a PyTerrier index (they are exported first if missing or outdated)
+        :param index_path: path of the PyTerrier index
+        :param path: directory of the exported statistics
+        :return: a NativeBM25Index
+        """
+        if not NativeBM25Index.is_exported(index_path, path):
+            NativeBM25Index.export(index_path, path)
+        print(f'Load native BM25 statistics from: {path}')
+        return NativeBM25Index(path)
+
+    @staticmethod
+    def export(index_path: str, path: str):
+        """
+        Exports the collection statistics and the direct index of a PyTerrier index into NumPy arrays
+        (the only step that requires the JVM)
+        :param index_path: path of the PyTerrier index
+        :param path: directory of the exported statistics
+        """
+        import pyterrier as pt
+        if not pt.started():
+            pt.init()
+
+        print(f'Export BM25 statistics from {index_path} to {path}')
+        index = pt.IndexFactory.of(index_path)
+        statistics = index.getCollectionStatistics()
+        no_documents = statistics.getNumberOfDocuments()
+        no_terms = statistics.getNumberOfUniqueTerms()
+
+        terms, term_ids = [], array('q')
+        term_df = np.zeros(no_terms, dtype=np.int64)
+        term_cf = np.zeros(no_terms, dtype=np.int64)
+        print('Exporting lexicon...')
+        for entry in tqdm(index.getLexicon(), total=no_terms):
+            term_id = entry.getValue().getTermId()
+            terms.append(entry.getKey())
+            term_ids.append(term_id)
+            term_df[term_id] = entry.getValue().getDocumentFrequency()
+            term_cf[term_id] = entry.getValue().getFrequency()
+
+        document_index = index.getDocumentIndex()
+        direct_index = index.getDirectIndex()
+        meta_index = index.getMetaIndex()
+        docnos = []
+        doc_lengths = np.zeros(no_documents, dtype=np.int64)
+        dv_offsets = np.zeros(no_documents + 1, dtype=np.int64)
+        dv_term_ids, dv_tfs = array('i'), array('i')
+        print('Exporting term vectors...')
+        for docid in tqdm(range(no_documents), total=no_documents):
+            docnos.append(meta_index.getItem("docno", docid))
+            doc_lengths[docid] = document_index.getDocumentLength(docid)
+            postings = direct_index.getPostings(document_index.getDocumentEntry(docid))
+            if postings is not None:
+                for posting in postings:
+                    dv_term_ids.append(posting.getId())
+                    dv_tfs.append(posting.getFrequency())
+            dv_offsets[docid + 1] = len(dv_term_ids)
+
+        # sorted lookups for docnos and terms
+        docnos = np.array(docnos, dtype=str)
+        docno_docids = np.argsort(docnos, kind='stable')
+        terms = np.array(terms, dtype=str)
+        term_order = np.argsort(terms, kind='stable')
+        arrays = dict(doc_lengths=doc_lengths,
+                      docnos=docnos[docno_docids],
+                      docno_docids=docno_docids,
+                      terms=terms[term_order],
+                      term_ids=np.frombuffer(term_ids, dtype=np.int64)[term_order],
+                      term_df=term_df,
+                      term_cf=term_cf,
+                      dv_offsets=dv_offsets,
+                      dv_term_ids=np.frombuffer(dv_term_ids, dtype=np.int32),
+                      dv_tfs=np.frombuffer(dv_tfs, dtype=np.int32))
+
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(path, f'{name}.npy'), arrays[name])
+        # the meta file is written last and marks a complete export
+        with open(os.path.join(path, 'meta.json'), 'wt') as f:
+            json.dump(dict(index_path=index_path,
+                           index_version=NativeBM25Index.get_index_version(index_path),
+                           no_documents=no_documents,
+                           avg_doc_length=statistics.getAverageDocumentLength()), f)
+        print('Finished!')
+
+    @staticmethod
+    def lookup(sorted_keys: np.ndarray, keys: list) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :return: the positions of the keys in the sorted array and a mask of the keys that were found
+        """
+        keys = np.array(keys, dtype=str)
+        positions = np.searchsorted(sorted_keys, keys)
+        positions = np.minimum(positions, len(sorted_keys) - 1)
+        found = sorted_keys[positions] == keys if len(sorted_keys) > 0 else np.zeros(len(keys), dtype=bool)
+        return positions, found
+
+    @staticmethod
+    def get_query_terms(query: str) -> Counter:
+        """
+        Tokenizes, filters and stems the query like Terrier's 'Stopwords,PorterStemmer' pipeline
+        :return: a Counter mapping a stemmed term to its query frequency
+        """
+        query_terms = Counter()
+        for token in query.lower().split():
+            if len(token) > MAX_TERM_LENGTH or token in STOPWORDS:
+                continue
+            query_terms[PORTER_STEMMER.stem(token)] += 1
+        return query_terms
+
+    def score(self, query: str, docnos: List[str]) -> List[Tuple[str, float]]:
+        """
+        Scores candidate documents with BM25
+        Documents that are not part of the index or do not contain any query term are skipped (like Terrier)
+        :param query: the query string
+        :param docnos: the docnos of the candidate documents
+        :return: a list of (docno, BM25 score) in the order of the candidates
+        """
+        query_terms = NativeBM25Index.get_query_terms(query)
+        if not query_terms or not docnos:
+            return []
+
+        # query term ids with their weights (idf * query term weight)
+        t_positions, t_found = NativeBM25Index.lookup(self.terms, list(query_terms.keys()))
+        term_ids = np.asarray(self.term_ids[t_positions[t_found]])
+        key_frequencies = np.array(list(query_terms.values()), dtype=np.float64)[t_found]
+        df = np.asarray(self.term_df[term_ids], dtype=np.float64)
+        if IGNORE_LOW_IDF_TERMS:
+            keep = np.asarray(self.term_cf[term_ids]) <= self.no_documents
+            term_ids, key_frequencies, df = term_ids[keep], key_frequencies[keep], df[keep]
+        if len(term_ids) == 0:
+            return []
+        idf = np.log2((self.no_documents - df + 0.5) / (df + 0.5))
+        term_weights = idf * ((BM25_K3 + 1.0) * key_frequencies / (BM25_K3 + key_frequencies))
+        term_order = np.argsort(term_ids)
+        term_ids, term_weights = term_ids[term_order], term_weights[term_order]
+
+        # candidate documents of the index
+        d_positions, d_found = NativeBM25Index.lookup(self.docnos, docnos)
+        candidates = [docno for docno, found in zip(docnos, d_found) if found]
+        docids = np.asarray(self.docno_docids[d_positions[d_found]])
+        if len(docids) == 0:
+            return []
+
+        # gather the term vectors of all candidates
+        starts = np.asarray(self.dv_offsets[docids])
+        lengths = np.asarray(self.dv_offsets[docids + 1]) - starts
+        owners = np.repeat(np.arange(len(docids)), lengths)
+        postings = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        posting_term_ids = np.asarray(self.dv_term_ids[postings])
+        matches = np.isin(posting_term_ids, term_ids)
+        owners, postings = owners[matches], postings[matches]
+        weights = term_weights[np.searchsorted(term_ids, posting_term_ids[matches])]
+
+        tf = np.asarray(self.dv_tfs[postings], dtype=np.float64)
+        doc_lengths = np.asarray(self.doc_lengths[docids], dtype=np.float64)[owners]
+        k = BM25_K1 * ((1.0 - BM25_B) + BM25_B * doc_lengths / self.avg_doc_length)
+        scores = np.bincount(owners, weights=weights * ((BM25_K1 + 1.0) * tf / (k + tf)), minlength=len(docids))
+        matched = np.bincount(owners, minlength=len(docids)) > 0
+        return [(docno, float(s)) for docno, s, m in zip(candidates, scores, matched) if m]
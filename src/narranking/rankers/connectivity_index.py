@@ -0,0 +1,53 @@
+import itertools
+from collections import Counter
+
+from narraplay.documentranking.document import AnalyzedNarrativeDocument
+
+
+class ConnectivityIndex:
+    """
+    Per-document node degree index of the document graph
+
+    The connectivity of a fragment is the number of document edges that touch the fragment nodes but are not
+    between them. It is derived from the node degrees of the fragment nodes:
+    sum of degrees - 2 * internal edges (without self loops) - internal self loops
+    The counts are memoized per node set and shared by all connectivity rankers.
+    The index is stored on the document and rebuilt after prepare_with_min_confidence.
+    """
+
+    def __init__(self, doc: AnalyzedNarrativeDocument):
+        self.doc = doc
+        self.node2degree = Counter()
+        self.so2edges = Counter()
+        for s, _, o in doc.graph:
+            self.so2edges[(s, o)] += 1
+            self.node2degree[s] += 1
+            # a self loop touches its node once
+            if o != s:
+                self.node2degree[o] += 1
+        self.__nodes2connectivity = dict()
+
+    @staticmethod
+    def of(doc: AnalyzedNarrativeDocument):
+        if doc.connectivity_index is None:
+            doc.connectivity_index = ConnectivityIndex(doc)
+        return doc.connectivity_index
+
+    def get_connectivity(self, fragment: list) -> int:
+        nodes = set()
+        for s, _, o in fragment:
+            nodes.add(s)
+            nodes.add(o)
+        nodes = frozenset(nodes)
+
+        if nodes not in self.__nodes2connectivity:
+            degrees = sum(self.node2degree[n] for n in nodes)
+            internal_edges, self_loops = 0, 0
+            for s, o in itertools.product(nodes, nodes):
+                if s == o:
+                    self_loops += self.so2edges[(s, o)]
+                else:
+                    internal_edges += self.so2edges[(s, o)]
+            # don't count edges between the fragment
+            self.__nodes2connectivity[nodes] = degrees - 2 * internal_edges - self_loops
+        return self.__nodes2connectivity[nodes]
@@ -0,0 +1,169 @@
+import itertools
+from typing import List
+
+import numpy as np
+
+from narraplay.documentranking.corpus import DocumentCorpus
+from narraplay.documentranking.document import AnalyzedNarrativeDocument
+from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.connectivity_index import ConnectivityIndex
+from narraplay.documentranking.rankers.neighbour_index import NeighbourEdgeIndex
+from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
+
+
+def _relational_sim_scores(query: AnalyzedQuery, doc: AnalyzedNarrativeDocument, corpus: DocumentCorpus, spo):
+    return NeighbourEdgeIndex.of(doc, corpus).get_relational_sim_scores(spo)
+
+
+def _relational_sim_tf_idf_scores(query: AnalyzedQuery, doc: AnalyzedNarrativeDocument, corpus: DocumentCorpus,
+                                  spo):
+    return NeighbourEdgeIndex.of(doc, corpus).get_tf_idf_scores(spo)
+
+
+def _relational_sim_translation_scores(query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
+                                       corpus: DocumentCorpus, spo):
+    return NeighbourEdgeIndex.of(doc, corpus).get_translation_scores(query, spo)
+
+
+# base quantities per statement: name -> function(query, doc, corpus, spo)
+STATEMENT_FEATURES = {
+    "tf": lambda q, d, c, spo: d.spo2frequency[spo],
+    "idf": lambda q, d, c, spo: c.get_idf_score(spo),
+    "tf_idf": lambda q, d, c, spo: BaseDocumentRanker.get_tf_idf(statement=spo, doc=d, corpus=c),
+    "subject_tf_idf": lambda q, d, c, spo: BaseDocumentRanker.get_concept_tf_idf(spo[0], doc=d, corpus=c),
+    "object_tf_idf": lambda q, d, c, spo: BaseDocumentRanker.get_concept_tf_idf(spo[2], doc=d, corpus=c),
+    "confidence_max": lambda q, d, c, spo: max(d.spo2confidences[spo]),
+    "confidence_avg": lambda q, d, c, spo: sum(d.spo2confidences[spo]) / len(d.spo2confidences[spo]),
+    "coverage": lambda q, d, c, spo: min(d.get_concept_coverage(spo[0]), d.get_concept_coverage(spo[2])),
+    "position": lambda q, d, c, spo: min(d.get_concept_relative_text_position(spo[0]),
+                                         d.get_concept_relative_text_position(spo[2])),
+    "sentence_weight": lambda q, d, c, spo: d.get_sentence_weight(spo)
+}
+
+# neighbourhood statistics per statement (lists of scores for the neighbour edges)
+STATEMENT_LIST_FEATURES = {
+    "relational_sim": _relational_sim_scores,
+    "relational_sim_tf_idf": _relational_sim_tf_idf_scores,
+    "relational_sim_translation": _relational_sim_translation_scores
+}
+
+
+def _connectivity(doc: AnalyzedNarrativeDocument, fragment):
+    return ConnectivityIndex.of(doc).get_connectivity(fragment)
+
+
+# base quantities per fragment: name -> function(doc, fragment)
+FRAGMENT_FEATURES = {
+    "connectivity": _connectivity
+}
+
+
+class DocumentFragmentFeatures:
+    """
+    Feature matrix for all fragments of a document
+
+    Statement features are stored as columns with one row per statement of each fragment
+    (statements of a fragment are consecutive rows, see offsets and lengths). Each base quantity
+    is computed at most once per distinct statement of the document, when a ranker requests it first.
+    Rankers aggregate the rows of each fragment (min, max, sum, mean).
+    """
+
+    def __init__(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument, corpus: DocumentCorpus,
+                 fragments: list):
+        self.query = query
+        self.doc = doc
+        self.corpus = corpus
+        self.fragments = fragments
+        self.no_fragments = len(fragments)
+        self.lengths = np.array([len(f) for f in fragments], dtype=np.int64)
+        self.offsets = np.zeros(self.no_fragments, dtype=np.int64)
+        if self.no_fragments > 1:
+            self.offsets[1:] = np.cumsum(self.lengths)[:-1]
+
+        # intern statements
+        spo2idx = dict()
+        self.statements = list()
+        rows = list()
+        for fragment in fragments:
+            for spo in fragment:
+                if spo not in spo2idx:
+                    spo2idx[spo] = len(self.statements)
+                    self.statements.append(spo)
+                rows.append(spo2idx[spo])
+        self.rows = np.array(rows, dtype=np.int64)
+
+        self.__columns = dict()
+        self.__list_columns = dict()
+        self.__fragment_columns = dict()
+        self.__translation_scores = None
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self.__columns:
+            feature = STATEMENT_FEATURES[name]
+            values = np.array([feature(self.query, self.doc, self.corpus, spo) for spo in self.statements],
+                              dtype=np.float64)
+            self.__columns[name] = values[self.rows]
+        return self.__columns[name]
+
+    def list_column(self, name: str) -> List[list]:
+        if name not in self.__list_columns:
+            feature = STATEMENT_LIST_FEATURES[name]
+            values = [feature(self.query, self.doc, self.corpus, spo) for spo in self.statements]
+            self.__list_columns[name] = [values[r] for r in self.rows.tolist()]
+        return self.__list_columns[name]
+
+    def fragment_column(self, name: str) -> np.ndarray:
+        if name not in self.__fragment_columns:
+            feature = FRAGMENT_FEATURES[name]
+            self.__fragment_columns[name] = np.array([feature(self.doc, f) for f in self.fragments],
+                                                     dtype=np.float64)
+        return self.__fragment_columns[name]
+
+    def translation_scores(self) -> np.ndarray:
+        # translation scores are memoized per distinct fragment on the query
+        if self.__translation_scores is None:
+            self.__translation_scores = np.array([self.query.get_fragment_translation_score(f)
+                                                  for f in self.fragments], dtype=np.float64)
+        return self.__translation_scores
+
+    def min(self, name: str) -> np.ndarray:
+        return np.minimum.reduceat(self.column(name), self.offsets)
+
+    def max(self, name: str) -> np.ndarray:
+        return np.maximum.reduceat(self.column(name), self.offsets)
+
+    def sum(self, name: str) -> np.ndarray:
+        return self.sum_values(self.column(name))
+
+    def mean(self, name: str) -> np.ndarray:
+        return self.sum(name) / self.lengths
+
+    def sum_values(self, values: np.ndarray) -> np.ndarray:
+        # sum the statements of each fragment from left to right (same order as a python sum)
+        result = np.zeros(self.no_fragments, dtype=np.float64)
+        for j in range(int(self.lengths.max(initial=0))):
+            mask = self.lengths > j
+            result[mask] += values[self.offsets[mask] + j]
+        return result
+
+    def fragment_lists(self, name: str) -> List[list]:
+        """
+        Concatenates the statement lists of each fragment (in statement order)
+        """
+        values = self.list_column(name)
+        return [list(itertools.chain.from_iterable(values[start:start + length]))
+                for start, length in zip(self.offsets.tolist(), self.lengths.tolist())]
+
+
+class FragmentFeatureEngine:
+
+    @staticmethod
+    def compute(query: AnalyzedQuery, doc: AnalyzedNarrativeDocument, corpus: DocumentCorpus,
+                fragments: list) -> DocumentFragmentFeatures:
+        return DocumentFragmentFeatures(query, doc, corpus, fragments)
+
+    @staticmethod
+    def compute_many(query: AnalyzedQuery, documents: List[AnalyzedNarrativeDocument], corpus: DocumentCorpus,
+                     fragments: list) -> List[DocumentFragmentFeatures]:
+        return [DocumentFragmentFeatures(query, doc, corpus, d_fragments)
+                for doc, d_fragments in zip(documents, fragments)]
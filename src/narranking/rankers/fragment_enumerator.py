@@ -0,0 +1,114 @@
+import heapq
+import itertools
+from typing import List, Callable
+
+
+class FragmentEnumerator:
+    """
+    Lazily enumerates the distinct fragments of a document
+
+    The input are the document predications for each query variant and each query position.
+    A fragment is an element of the cross product over all positions of a variant.
+    Predications are deduplicated per position before the product is taken and the number of
+    fragments per document can be bounded. If an upper bound function for statements is given, fragments
+    are yielded in descending order of their upper bound (maximum over the statement bounds),
+    so that max-based rankers can stop early.
+    """
+
+    def __init__(self, max_fragments: int = 0):
+        """
+        :param max_fragments: maximum number of fragments per document (0 = unlimited)
+        """
+        self.max_fragments = max_fragments
+        self.yielded_fragments = 0
+        self.pruned_fragments = 0
+
+    def reset_statistics(self):
+        self.yielded_fragments = 0
+        self.pruned_fragments = 0
+
+    @staticmethod
+    def _deduplicate_positions(predications_per_variant: List[List[list]], upper_bound: Callable = None):
+        variants = []
+        for predications_per_position in predications_per_variant:
+            positions = []
+            for predications in predications_per_position:
+                # dict keeps the order of the first occurrence
+                predications = list(dict.fromkeys(predications))
+                if upper_bound:
+                    predications.sort(key=upper_bound, reverse=True)
+                positions.append(predications)
+            variants.append(positions)
+        return variants
+
+    @staticmethod
+    def _count_combinations(variants):
+        total = 0
+        for positions in variants:
+            if not positions:
+                continue
+            count = 1
+            for predications in positions:
+                count *= len(predications)
+            total += count
+        return total
+
+    def enumerate(self, predications_per_variant: List[List[list]], upper_bound: Callable = None):
+        """
+        Yields the distinct fragments of a document
+        :param predications_per_variant: for each query variant a list of predications per query position
+        :param upper_bound: optional function that maps a statement to an upper bound of its score
+        :return: a generator of fragments (tuples of statements)
+        """
+        variants = FragmentEnumerator._deduplicate_positions(predications_per_variant, upper_bound)
+        total = FragmentEnumerator._count_combinations(variants)
+        if upper_bound:
+            combinations = FragmentEnumerator._enumerate_by_upper_bound(variants, upper_bound)
+        else:
+            combinations = itertools.chain.from_iterable(itertools.product(*positions) for positions in variants
+                                                         if positions)
+
+        visited = 0
+        seen = set()
+        try:
+            for fragment in combinations:
+                visited += 1
+                if fragment in seen:
+                    continue
+                seen.add(fragment)
+                self.yielded_fragments += 1
+                yield fragment
+                if 0 < self.max_fragments <= len(seen):
+                    break
+        finally:
+            self.pruned_fragments += total - visited
+
+    @staticmethod
+    def _enumerate_by_upper_bound(variants, upper_bound: Callable):
+        # best-first enumeration over the cross products of all variants
+        # positions are sorted descending, so successors never have a higher bound than their predecessor
+        bounds = [[[upper_bound(p) for p in predications] for predications in positions] for positions in variants]
+        heap = []
+        visited = set()
+        for v_idx, positions in enumerate(variants):
+            if not positions or any(len(predications) == 0 for predications in positions):
+                continue
+            start = (0,) * len(positions)
+            visited.add((v_idx, start))
+            heap.append((-max(b[0] for b in bounds[v_idx]), v_idx, start))
+        heapq.heapify(heap)
+
+        while heap:
+            _, v_idx, indexes = heapq.heappop(heap)
+            positions = variants[v_idx]
+            yield tuple(positions[pos][idx] for pos, idx in enumerate(indexes))
+
+            for pos in range(len(indexes)):
+                if indexes[pos] + 1 >= len(positions[pos]):
+                    continue
+                successor = indexes[:pos] + (indexes[pos] + 1,) + indexes[pos + 1:]
+                if (v_idx, successor) in visited:
+                    continue
+                visited.add((v_idx, successor))
+                bound = max(bounds[v_idx][p][i] for p, i in enumerate(successor))
+                heapq.heappush(heap, (-bound, v_idx, successor))
@@ -1,58 +1,77 @@
-import itertools
-import json
 import os
+from typing import List, Callable
 
 from narraint.backend.database import SessionExtended
 from narraint.backend.models import Predication
 from narraplay.documentranking.benchmark import Benchmark
-from narraplay.documentranking.config import RESULT_DIR_FIRST_STAGE
+from narraplay.documentranking.config import RESULT_DIR_FIRST_STAGE, QUERY_YIELD_PER_K, PREDICATION_QUERY_BATCH_SIZE
 from narraplay.documentranking.document import AnalyzedNarrativeDocument
 from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.fragment_enumerator import FragmentEnumerator
+from narraplay.documentranking.rankers.predication_lookup import PredicationLookupTable
+from narraplay.documentranking.rankers.provenance_store import ProvenanceStore
 from narraplay.documentranking.retriever import DocumentRetriever
 
 
 class GraphFragment:
-    def __init__(self, file_path):
-        self.file_path = file_path
-        self.pos2prov_dict = self.read_pos2prov_from_file()
-
-    def read_pos2prov_from_file(self):
-        with open(self.file_path) as file:
-            return json.load(file)
-
-    def matches(self, query: AnalyzedQuery, document: AnalyzedNarrativeDocument):
+    def __init__(self, file_path, max_fragments_per_document: int = 0, fragment_upper_bound: Callable = None):
         """
-        Computes all distinct subgraph isomorphism between the query q and the document graph of d.
-        Each subgraph isomorphism maps a part of the document graph to the query.
-        Note that if q asks for two statements, each isomorphism must map two document edges to the
-        corresponding query graph edges.
-
-        Given two statements in a query:
-        stmt1 maps to which edges of the document graph g? -> given by query engine through predication ids
-        stmt2 maps to which edges of the document graph g? -> given by query engine through predication ids
-        Cross product between all combinations
+        :param file_path: path to the pos2prov file of a first stage run
+        :param max_fragments_per_document: maximum number of fragments per document (0 = unlimited)
+        :param fragment_upper_bound: optional function (document, statement) -> upper bound of the statement score;
+                                     fragments are then enumerated (and capped) in descending bound order
         """
-        pos2prov_dict = self.pos2prov_dict[document.collection][str(query.topic.query_id)]
-        if document.document_id_source not in pos2prov_dict:
+        self.enumerator = FragmentEnumerator(max_fragments=max_fragments_per_document)
+        self.fragment_upper_bound = fragment_upper_bound
+        # the provenance is loaded once from a binary store (pos2prov JSON files are converted on first use)
+        self.file_path = file_path
+        self.provenance = ProvenanceStore.open_for_json(file_path)
+        # an offline built lookup table is used to resolve predication ids without the database
+        self.lookup_table = PredicationLookupTable.load()
+
+    def get_document_predications(self, query: AnalyzedQuery, document: AnalyzedNarrativeDocument) -> dict:
+        topic_id = str(query.topic.query_id)
+        if not self.provenance.has_document(document.collection, topic_id, document.document_id_source):
             raise ValueError(f'Document {document.document_id_source} has no provenance information')
 
         # relevant document predications
-        doc_predications = pos2prov_dict[document.document_id_source]
+        return self.provenance.get_document(document.collection, topic_id, document.document_id_source)
 
+    @staticmethod
+    def get_predication_ids(doc_predications: dict) -> set:
         document_predication_ids = set()
         for q_idx in doc_predications:
             for pos in doc_predications[q_idx]:
                 document_predication_ids.update(doc_predications[q_idx][pos])
-        # retrieve relevant predication mappings (id -> (subject, object))
+        return document_predication_ids
+
+    def resolve_predications(self, predication_ids: set) -> dict:
+        if self.lookup_table:
+            predications, missing_ids = self.lookup_table.lookup(predication_ids)
+            # only ask the database for ids that are not covered by the lookup table
+            if missing_ids:
+                predications.update(GraphFragment.query_predications(missing_ids))
+            return predications
+        return GraphFragment.query_predications(predication_ids)
+
+    @staticmethod
+    def query_predications(predication_ids: set) -> dict:
+        # retrieve relevant predication mappings (id -> (subject, relation, object)) in batches of ids
         session = SessionExtended.get()
-        q = session.query(Predication.id, Predication.subject_id, Predication.relation, Predication.object_id)
-        q = q.filter(Predication.id.in_(document_predication_ids))
         predications = dict()
-        for pid, s, p, o in q:
-            predications[pid] = (s, p, o)
-
+        predication_ids = sorted(predication_ids)
+        for i in range(0, len(predication_ids), PREDICATION_QUERY_BATCH_SIZE):
+            batch = predication_ids[i:i + PREDICATION_QUERY_BATCH_SIZE]
+            q = session.query(Predication.id, Predication.subject_id, Predication.relation, Predication.object_id)
+            q = q.filter(Predication.id.in_(batch))
+            q = q.yield_per(QUERY_YIELD_PER_K)
+            for pid, s, p, o in q:
+                predications[pid] = (s, p, o)
+        return predications
+
+    def build_fragments(self, document: AnalyzedNarrativeDocument, doc_predications: dict, predications: dict):
         # For each possible executed query
-        fragments = list()
+        predications_per_variant = list()
         for q_idx in doc_predications:
             # For each statement in that query
             doc_predications_per_position = list()
@@ -63,13 +82,48 @@ class GraphFragment:
                     pos_doc_predications.append(predications[so])
 
                 doc_predications_per_position.append(pos_doc_predications)
+            predications_per_variant.append(doc_predications_per_position)
+
+        upper_bound = None
+        if self.fragment_upper_bound:
+            upper_bound = lambda spo: self.fragment_upper_bound(document, spo)
+
+        # lazy cross-product over all statements (without duplicated fragments)
+        return list(self.enumerator.enumerate(predications_per_variant, upper_bound=upper_bound))
+
+    def matches(self, query: AnalyzedQuery, document: AnalyzedNarrativeDocument):
+        """
+        Computes all distinct subgraph isomorphism between the query q and the document graph of d.
+        Each subgraph isomorphism maps a part of the document graph to the query.
+        Note that if q asks for two statements, each isomorphism must map two document edges to the
+        corresponding query graph edges.
+
+        Given two statements in a query:
+        stmt1 maps to which edges of the document graph g? -> given by query engine through predication ids
+        stmt2 maps to which edges of the document graph g? -> given by query engine through predication ids
+        Cross product between all combinations
+        """
+        doc_predications = self.get_document_predications(query, document)
+        predications = self.resolve_predications(GraphFragment.get_predication_ids(doc_predications))
+        return self.build_fragments(document, doc_predications, predications)
+
+    def matches_many(self, query: AnalyzedQuery, documents: List[AnalyzedNarrativeDocument]):
+        """
+        Computes the fragments (see matches) for all documents of a topic
+        The predication ids of all documents are resolved together (in batches of PREDICATION_QUERY_BATCH_SIZE ids)
+        :param query: the analyzed query
+        :param documents: a list of documents
+        :return: a list of fragments for each document (same order as documents)
+        """
+        doc_predications_list = [self.get_document_predications(query, d) for d in documents]
 
-            # cross-product over all statements
-            fragments.extend(list(itertools.product(*doc_predications_per_position)))
+        predication_ids = set()
+        for doc_predications in doc_predications_list:
+            predication_ids.update(GraphFragment.get_predication_ids(doc_predications))
 
-        # remove duplicated fragments
-        fragments = list(set(fragments))
-        return fragments
+        predications = self.resolve_predications(predication_ids)
+        return [self.build_fragments(d, doc_predications, predications)
+                for d, doc_predications in zip(documents, doc_predications_list)]
 
 
 if __name__ == "__main__":
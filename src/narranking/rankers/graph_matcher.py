@@ -0,0 +1,79 @@
+import itertools
+from typing import List, Callable
+
+from narraplay.documentranking.document import AnalyzedNarrativeDocument
+from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.fragment_enumerator import FragmentEnumerator
+
+
+class QueryGraphMatcher:
+    """
+    Derives the fragments of a document by matching the query graph against the document graph in memory
+    (no first stage provenance is required)
+
+    The query variants are the same as in the graph first stages:
+    - full match: each variant connects all query components via len(components) - 1 'associated' edges
+    - partial match: documents without a full match are matched by the first component pair that they contain
+
+    Unlike the first stages (QueryEngine.process_query_with_expansion), query concepts are not expanded by their
+    ontological sub concepts, i.e., statements that only match an expanded concept are not part of any fragment.
+    """
+
+    def __init__(self, partial_match: bool = False, max_fragments_per_document: int = 0,
+                 fragment_upper_bound: Callable = None):
+        self.partial_match = partial_match
+        self.enumerator = FragmentEnumerator(max_fragments=max_fragments_per_document)
+        self.fragment_upper_bound = fragment_upper_bound
+
+    @staticmethod
+    def get_edge_statements(component_a: set, component_b: set, document: AnalyzedNarrativeDocument) -> list:
+        # an 'associated' edge is matched by every document statement between both components
+        statements = list()
+        for subj, obj in itertools.product(component_a, component_b):
+            if (subj, obj) in document.so2statement:
+                for stmt in document.so2statement[(subj, obj)]:
+                    statements.append((stmt.subject_id, stmt.relation, stmt.object_id))
+        return statements
+
+    def get_document_predications(self, query: AnalyzedQuery, document: AnalyzedNarrativeDocument) -> list:
+        components = [set(concepts) for concepts in query.component2concepts.values()]
+        if len(components) < 2:
+            return list()
+
+        pair2statements = dict()
+        for pair in itertools.combinations(range(len(components)), r=2):
+            pair2statements[pair] = QueryGraphMatcher.get_edge_statements(components[pair[0]], components[pair[1]],
+                                                                          document)
+
+        # full match: each variant is a set of edges that connects all components
+        predications_per_variant = list()
+        for pair_edges in itertools.combinations(pair2statements.keys(), r=len(components) - 1):
+            predications_per_position = [pair2statements[pair] for pair in pair_edges]
+            if all(len(predications) > 0 for predications in predications_per_position):
+                predications_per_variant.append(predications_per_position)
+
+        if predications_per_variant or not self.partial_match:
+            return predications_per_variant
+
+        # partial match: the first component pair matched by the document
+        for pair, statements in pair2statements.items():
+            if len(statements) > 0:
+                return [[statements]]
+        return list()
+
+    def matches(self, query: AnalyzedQuery, document: AnalyzedNarrativeDocument):
+        """
+        Computes all distinct fragments between the query graph and the document graph
+        :param query: the analyzed query
+        :param document: a prepared document (see prepare_with_min_confidence)
+        :return: a list of fragments (might be empty if the document does not match the query graph)
+        """
+        upper_bound = None
+        if self.fragment_upper_bound:
+            upper_bound = lambda spo: self.fragment_upper_bound(document, spo)
+
+        predications_per_variant = self.get_document_predications(query, document)
+        return list(self.enumerator.enumerate(predications_per_variant, upper_bound=upper_bound))
+
+    def matches_many(self, query: AnalyzedQuery, documents: List[AnalyzedNarrativeDocument]):
+        return [self.matches(query, d) for d in documents]
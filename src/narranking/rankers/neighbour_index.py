@@ -0,0 +1,100 @@
+import itertools
+
+from narraplay.documentranking.corpus import DocumentCorpus
+from narraplay.documentranking.document import AnalyzedNarrativeDocument
+from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
+
+
+class NeighbourEdgeIndex:
+    """
+    Per-document index of the edges that are incident to a concept
+
+    Each distinct edge of the document is scored once (tf-idf, confidence and the relational similarity
+    term confidence * tf-idf * coverage) and shared by all relational similarity rankers.
+    The index is stored on the document and rebuilt after prepare_with_min_confidence.
+    """
+
+    def __init__(self, doc: AnalyzedNarrativeDocument, corpus: DocumentCorpus):
+        self.doc = doc
+        self.corpus = corpus
+        self.edges = list()
+        self.tf_idf = list()
+        self.confidence = list()
+        self.relational_sim = list()
+        self.__edge2idx = dict()
+        self.__concept2edges = dict()
+        self.__spo2neighbours = dict()
+
+    @staticmethod
+    def of(doc: AnalyzedNarrativeDocument, corpus: DocumentCorpus):
+        index = doc.neighbour_index
+        if index is None or index.corpus is not corpus:
+            index = NeighbourEdgeIndex(doc, corpus)
+            doc.neighbour_index = index
+        return index
+
+    def __get_edge_idx(self, n_spo: tuple) -> int:
+        if n_spo not in self.__edge2idx:
+            doc = self.doc
+            tf_idf = BaseDocumentRanker.get_tf_idf(statement=n_spo, doc=doc, corpus=self.corpus)
+            confidence = max(doc.spo2confidences[n_spo])
+            coverage = min(doc.get_concept_coverage(n_spo[0]), doc.get_concept_frequency(n_spo[2]))
+
+            self.__edge2idx[n_spo] = len(self.edges)
+            self.edges.append(n_spo)
+            self.tf_idf.append(tf_idf)
+            self.confidence.append(confidence)
+            self.relational_sim.append(confidence * tf_idf * coverage)
+        return self.__edge2idx[n_spo]
+
+    def get_concept_edges(self, concept: str) -> list:
+        """
+        The distinct edges incident to a concept (in the order of doc.concept2statement)
+        :return: a list of edge indexes
+        """
+        if concept not in self.__concept2edges:
+            edges = list()
+            for statement in self.doc.concept2statement[concept]:
+                edge_idx = self.__get_edge_idx((statement.subject_id, statement.relation, statement.object_id))
+                edges.append(edge_idx)
+            self.__concept2edges[concept] = list(dict.fromkeys(edges))
+        return self.__concept2edges[concept]
+
+    def get_neighbour_edges(self, spo: tuple) -> list:
+        """
+        The neighbour edges of a statement, i.e., distinct edges that share its subject or object
+        (edges between the subject and object of the statement are skipped)
+        :return: a list of edge indexes
+        """
+        if spo not in self.__spo2neighbours:
+            neighbours = list()
+            for edge_idx in dict.fromkeys(itertools.chain(self.get_concept_edges(spo[0]),
+                                                          self.get_concept_edges(spo[2]))):
+                n_spo = self.edges[edge_idx]
+                # skip edges between the fragment
+                if n_spo[0] == spo[0] and n_spo[2] == spo[2]:
+                    continue
+
+                # neighbour edge = edge that is connected to the fragment via subject or object
+                if n_spo[0] == spo[0] or n_spo[2] == spo[2]:
+                    neighbours.append(edge_idx)
+            self.__spo2neighbours[spo] = neighbours
+        return self.__spo2neighbours[spo]
+
+    def get_relational_sim_scores(self, spo: tuple) -> list:
+        return [self.relational_sim[e] for e in self.get_neighbour_edges(spo)]
+
+    def get_tf_idf_scores(self, spo: tuple) -> list:
+        return [self.tf_idf[e] for e in self.get_neighbour_edges(spo)]
+
+    def get_translation_scores(self, query: AnalyzedQuery, spo: tuple) -> list:
+        scores = list()
+        confidence = max(self.doc.spo2confidences[spo])
+        for e in self.get_neighbour_edges(spo):
+            if self.edges[e][0] == spo[0]:
+                translation_score = query.concept2score[spo[0]]
+            else:
+                translation_score = query.concept2score[spo[2]]
+            scores.append(translation_score * confidence * self.tf_idf[e])
+        return scores
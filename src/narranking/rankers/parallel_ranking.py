@@ -0,0 +1,127 @@
+import multiprocessing
+from typing import List, Tuple, Dict
+
+import numpy as np
+
+from narraplay.documentranking.corpus import DocumentCorpus
+from narraplay.documentranking.document import AnalyzedNarrativeDocument
+from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.feature_engine import FragmentFeatureEngine
+from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
+from narraplay.documentranking.rankers.registry import load_rankers
+
+# state of a shard worker process (loaded once by _init_shard_worker)
+_WORKER_STATE = {}
+
+
+def _init_shard_worker(ranker_names: [str], collections: [str]):
+    _WORKER_STATE["rankers"] = {r.name: r for r in load_rankers(ranker_names)}
+    _WORKER_STATE["corpus"] = DocumentCorpus(collections=collections)
+
+
+def _score_document_shard(rankers: List[BaseDocumentRanker], query: AnalyzedQuery,
+                          narrative_documents: List[AnalyzedNarrativeDocument], corpus: DocumentCorpus,
+                          fragments: list, features: list = None):
+    return [ranker.score_documents(query, narrative_documents, corpus, fragments, features) for ranker in rankers]
+
+
+def _score_document_shard_in_worker(task):
+    ranker_names, query, narrative_documents, fragments, use_features = task
+    rankers = [_WORKER_STATE["rankers"][name] for name in ranker_names]
+    corpus = _WORKER_STATE["corpus"]
+    # the feature matrices reference the corpus, so they are built in the worker instead of being sent
+    features = None
+    if use_features:
+        features = FragmentFeatureEngine.compute_many(query, narrative_documents, corpus, fragments)
+    return _score_document_shard(rankers, query, narrative_documents, corpus, fragments, features)
+
+
+class ShardedRankingExecutor:
+    """
+    Ranks the documents of a topic with a pool of worker processes
+
+    The documents are split into contiguous shards. Each worker computes the raw fragment scores of all
+    fragment-based rankers for its shard, so that the feature matrix of a document is shared by all rankers.
+    The normalization by the maximum fragment score is done centrally after all shards are collected (in
+    document order), i.e., the results are identical to a sequential run.
+    One pool is used for the whole run. Workers are started with spawn (the JVM of the BM25 rankers and open
+    database sessions do not survive a fork) and load the rankers and the corpus once; the query and the documents
+    of each shard are sent to the workers, which build the feature matrices of their shard. Close the executor (or use it as a context manager) after the run.
+    """
+
+    def __init__(self, workers: int, ranker_names: [str] = None, collections: [str] = None):
+        """
+        :param workers: number of worker processes (<= 1 = run sequentially in this process)
+        :param ranker_names: names of the rankers that are loaded by the workers
+        :param collections: document collections of the corpus that is loaded by the workers
+        """
+        self.workers = workers
+        self.pool = None
+        if workers > 1:
+            self.pool = multiprocessing.get_context('spawn').Pool(processes=workers, initializer=_init_shard_worker,
+                                                                  initargs=(ranker_names, collections))
+
+    def close(self):
+        if self.pool:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def is_fragment_ranker(ranker: BaseDocumentRanker) -> bool:
+        # rankers that override rank_documents do not score fragments (e.g., BM25 or document length)
+        return type(ranker).rank_documents is BaseDocumentRanker.rank_documents
+
+    def get_shards(self, no_documents: int) -> List[Tuple[int, int]]:
+        no_shards = max(1, min(self.workers, no_documents))
+        bounds = np.linspace(0, no_documents, no_shards + 1).astype(np.int64).tolist()
+        return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if start < end]
+
+    def rank_documents(self, rankers: List[BaseDocumentRanker], query: AnalyzedQuery,
+                       narrative_documents: List[AnalyzedNarrativeDocument], corpus: DocumentCorpus,
+                       fragments: list, features: list = None,
+                       top_k: int = 0) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Ranks the documents with all fragment-based rankers
+        :param rankers: a list of rankers (rankers that are not fragment-based are skipped)
+        :param query: the analyzed query
+        :param narrative_documents: prepared documents of the topic
+        :param corpus: the document corpus
+        :param fragments: the fragments of each document
+        :param features: the feature matrix of each document (optional, workers build their own matrices)
+        :param top_k: only return the k best documents per ranker (0 = all documents)
+        :return: a dictionary mapping a ranker name to its ranked documents
+        """
+        rankers = [r for r in rankers if ShardedRankingExecutor.is_fragment_ranker(r)]
+        shards = self.get_shards(len(narrative_documents))
+        if not self.pool or len(shards) <= 1:
+            shard_results = [_score_document_shard(rankers, query, narrative_documents[start:end], corpus,
+                                                   fragments[start:end], features[start:end] if features else None)
+                             for start, end in shards]
+        else:
+            ranker_names = [r.name for r in rankers]
+            tasks = [(ranker_names, query, narrative_documents[start:end], fragments[start:end], bool(features))
+                     for start, end in shards]
+            shard_results = self.pool.map(_score_document_shard_in_worker, tasks, chunksize=1)
+
+        ranker2ranked_docs = dict()
+        for r_idx, ranker in enumerate(rankers):
+            lengths, doc_scores, doc_translation_scores = [], [], []
+            for shard_result in shard_results:
+                s_lengths, s_scores, s_translation_scores = shard_result[r_idx]
+                lengths.append(s_lengths)
+                doc_scores.extend(s_scores)
+                doc_translation_scores.extend(s_translation_scores)
+
+            lengths = np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.int64)
+            ranker2ranked_docs[ranker.name] = BaseDocumentRanker.aggregate_fragment_scores(narrative_documents,
+                                                                                           lengths, doc_scores,
+                                                                                           doc_translation_scores,
+                                                                                           top_k=top_k)
+        return ranker2ranked_docs
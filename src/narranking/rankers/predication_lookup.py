@@ -0,0 +1,195 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+from array import array
+
+import numpy as np
+from sqlalchemy import func
+from tqdm import tqdm
+
+from narraint.backend.database import SessionExtended
+from narraint.backend.models import Predication
+from narraplay.documentranking.config import PREDICATION_LOOKUP_PATH, QUERY_YIELD_PER_K, CHECK_PREDICATION_LOOKUP
+
+
+class PredicationLookupTable:
+    """
+    Memory-mapped lookup table from predication ids to (subject, relation, object)
+
+    The table consists of a sorted id array and three columns of interned concept/relation codes:
+    - ids.npy: sorted predication ids (int64)
+    - subjects.npy, relations.npy, objects.npy: codes (int32) aligned with ids
+    - vocabulary.json: the concept and relation strings for the codes, the number of predications and their
+      maximum id (to detect tables that do not match the Predication table anymore, see is_up_to_date)
+    The table is only (re)built explicitly, see main.
+    """
+
+    def __init__(self, path=PREDICATION_LOOKUP_PATH):
+        self.path = path
+        self.ids = np.load(os.path.join(path, 'ids.npy'), mmap_mode='r')
+        self.subjects = np.load(os.path.join(path, 'subjects.npy'), mmap_mode='r')
+        self.relations = np.load(os.path.join(path, 'relations.npy'), mmap_mode='r')
+        self.objects = np.load(os.path.join(path, 'objects.npy'), mmap_mode='r')
+        with open(os.path.join(path, 'vocabulary.json'), 'rt') as f:
+            vocabulary = json.load(f)
+        self.concepts = vocabulary["concepts"]
+        self.relation_names = vocabulary["relations"]
+        self.collections = vocabulary["collections"]
+        # tables of older versions do not contain the version information (they are never up to date)
+        self.no_predications = vocabulary.get("no_predications")
+        self.max_predication_id = vocabulary.get("max_predication_id")
+        print(f'Loaded predication lookup table with {len(self.ids)} entries (collections = {self.collections})')
+
+    @staticmethod
+    def exists(path=PREDICATION_LOOKUP_PATH) -> bool:
+        return os.path.isfile(os.path.join(path, 'vocabulary.json'))
+
+    @staticmethod
+    def count_predications(collections: [str]):
+        """
+        :return: the number of predications (with a relation) of the collections and their maximum id
+        """
+        session = SessionExtended.get()
+        q = session.query(func.count(Predication.id), func.max(Predication.id))
+        q = q.filter(Predication.document_collection.in_(collections))
+        q = q.filter(Predication.relation != None)
+        no_predications, max_predication_id = q.one()
+        return no_predications, max_predication_id
+
+    def is_up_to_date(self) -> bool:
+        # predication ids are reused after cleaning or re-extraction, i.e., a changed table resolves to wrong triples
+        return (self.no_predications, self.max_predication_id) == \
+            PredicationLookupTable.count_predications(self.collections)
+
+    @staticmethod
+    def load(path=PREDICATION_LOOKUP_PATH, check: bool = CHECK_PREDICATION_LOOKUP):
+        """
+        Loads the lookup table (it is never rebuilt implicitly)
+        :param path: the directory of the table
+        :param check: compare the table with the Predication table first
+        :return: the lookup table or None if the table does not exist or is outdated
+        """
+        if not PredicationLookupTable.exists(path):
+            return None
+        table = PredicationLookupTable(path)
+        if check and not table.is_up_to_date():
+            logging.warning(f'Predication table has changed since the lookup table {path} was built - predications '
+                            f'are resolved with the database (rebuild the table with predication_lookup.py)')
+            return None
+        return table
+
+    def lookup(self, predication_ids: set):
+        """
+        Resolves predication ids to (subject, relation, object) triples
+        :param predication_ids: a set of predication ids
+        :return: a dictionary with all resolved ids and the set of ids that are not contained in the table
+        """
+        predications = dict()
+        if len(predication_ids) == 0 or len(self.ids) == 0:
+            return predications, set(predication_ids)
+
+        query_ids = np.fromiter(predication_ids, dtype=np.int64, count=len(predication_ids))
+        positions = np.searchsorted(self.ids, query_ids)
+        positions[positions == len(self.ids)] = 0
+        found = self.ids[positions] == query_ids
+
+        found_positions = positions[found]
+        for pid, s, p, o in zip(query_ids[found].tolist(), self.subjects[found_positions].tolist(),
+                                self.relations[found_positions].tolist(), self.objects[found_positions].tolist()):
+            predications[pid] = (self.concepts[s], self.relation_names[p], self.concepts[o])
+
+        missing = set(query_ids[~found].tolist())
+        return predications, missing
+
+    @staticmethod
+    def build(collections: [str], path=PREDICATION_LOOKUP_PATH):
+        """
+        Builds the lookup table for all predications (with a relation) of the given collections
+        :param collections: a list of document collections
+        :param path: the target directory
+        :return: None
+        """
+        # the table is written into a new directory that replaces the old table at the end
+        # (processes that still memory-map the old files keep reading them)
+        build_path = f'{path}_build'
+        if os.path.exists(build_path):
+            shutil.rmtree(build_path)
+        os.makedirs(build_path)
+
+        session = SessionExtended.get()
+        concept2code = dict()
+        relation2code = dict()
+        ids, subjects, relations, objects = array('q'), array('i'), array('i'), array('i')
+        for collection in collections:
+            logging.info(f'Loading predications of collection: {collection}')
+            total = session.query(Predication.id).filter(Predication.document_collection == collection).count()
+            q = session.query(Predication.id, Predication.subject_id, Predication.relation, Predication.object_id)
+            q = q.filter(Predication.document_collection == collection)
+            q = q.filter(Predication.relation != None)
+            q = q.yield_per(QUERY_YIELD_PER_K)
+            for pid, s, p, o in tqdm(q, total=total, desc=f'Interning {collection} predications'):
+                ids.append(pid)
+                subjects.append(concept2code.setdefault(s, len(concept2code)))
+                relations.append(relation2code.setdefault(p, len(relation2code)))
+                objects.append(concept2code.setdefault(o, len(concept2code)))
+
+        logging.info(f'Sorting {len(ids)} predication ids...')
+        ids = np.frombuffer(ids, dtype=np.int64)
+        max_predication_id = int(ids.max()) if len(ids) > 0 else None
+        order = np.argsort(ids, kind='stable')
+        np.save(os.path.join(build_path, 'ids.npy'), ids[order])
+        np.save(os.path.join(build_path, 'subjects.npy'), np.frombuffer(subjects, dtype=np.int32)[order])
+        np.save(os.path.join(build_path, 'relations.npy'), np.frombuffer(relations, dtype=np.int32)[order])
+        np.save(os.path.join(build_path, 'objects.npy'), np.frombuffer(objects, dtype=np.int32)[order])
+
+        # dictionaries keep the insertion order, i.e., the code order
+        with open(os.path.join(build_path, 'vocabulary.json'), 'wt') as f:
+            json.dump(dict(collections=sorted(collections),
+                           no_predications=len(ids),
+                           max_predication_id=max_predication_id,
+                           concepts=list(concept2code.keys()),
+                           relations=list(relation2code.keys())), f)
+        if os.path.exists(path):
+            old_path = f'{path}_old'
+            shutil.rmtree(old_path, ignore_errors=True)
+            os.rename(path, old_path)
+            os.rename(build_path, path)
+            shutil.rmtree(old_path)
+        else:
+            os.rename(build_path, path)
+        logging.info(f'Predication lookup table written to {path}')
+
+
+def main() -> int:
+    from narraplay.documentranking.run_config import BENCHMARKS
+
+    logging.basicConfig(format='%(asctime)s,%(msecs)d %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s',
+                        datefmt='%Y-%m-%d:%H:%M:%S',
+                        level=logging.INFO)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--check", action="store_true",
+                        help="only check whether the table matches the Predication table (exit code 1 if not)")
+    parser.add_argument("--force", action="store_true", help="rebuild the table even if it is up to date")
+    args = parser.parse_args()
+
+    collections = set()
+    for bench in BENCHMARKS:
+        collections.update(bench.document_collections)
+
+    up_to_date = False
+    if PredicationLookupTable.exists():
+        table = PredicationLookupTable()
+        up_to_date = table.collections == sorted(collections) and table.is_up_to_date()
+    logging.info(f'Predication lookup table is up to date: {up_to_date}')
+    if args.check:
+        return 0 if up_to_date else 1
+    if not up_to_date or args.force:
+        PredicationLookupTable.build(sorted(collections))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,132 @@
+import json
+import mmap
+import os
+import pickle
+from array import array
+
+
+class ProvenanceStore:
+    """
+    Compact binary storage for the provenance (pos2prov) information of a first stage run
+
+    The data file stores one record per (collection, topic, document) as a flat int64 array:
+        [#queries, (query_idx, #positions, (position, #ids, id_1, ..., id_n)*)*]
+    Records of a topic are stored contiguously. The index file maps each (collection, topic)
+    to its byte range and each document to the byte range of its record.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data_path = path + '.bin'
+        self.index_path = path + '.idx'
+        with open(self.index_path, 'rb') as f:
+            self.index = pickle.load(f)
+
+        self.__file = open(self.data_path, 'rb')
+        if os.path.getsize(self.data_path) > 0:
+            self.__data = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.__data = b''
+
+    def close(self):
+        if isinstance(self.__data, mmap.mmap):
+            self.__data.close()
+        self.__file.close()
+
+    @staticmethod
+    def path_for_json(json_path: str) -> str:
+        # foo_pos2prov.json -> foo_pos2prov
+        return os.path.splitext(json_path)[0]
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.isfile(path + '.bin') and os.path.isfile(path + '.idx')
+
+    @staticmethod
+    def _encode_record(query2pos2prov: dict) -> array:
+        values = array('q', [len(query2pos2prov)])
+        for q_idx, pos2prov in query2pos2prov.items():
+            values.extend((int(q_idx), len(pos2prov)))
+            for pos, prov_ids in pos2prov.items():
+                values.extend((int(pos), len(prov_ids)))
+                values.extend(int(pid) for pid in prov_ids)
+        return values
+
+    @staticmethod
+    def _decode_record(data) -> dict:
+        values = array('q')
+        values.frombytes(data)
+        query2pos2prov = dict()
+        idx = 1
+        for _ in range(values[0]):
+            q_idx, no_positions = values[idx], values[idx + 1]
+            idx += 2
+            pos2prov = dict()
+            for _ in range(no_positions):
+                pos, no_ids = values[idx], values[idx + 1]
+                idx += 2
+                pos2prov[pos] = values[idx:idx + no_ids].tolist()
+                idx += no_ids
+            query2pos2prov[q_idx] = pos2prov
+        return query2pos2prov
+
+    @staticmethod
+    def write(path: str, pos2prov_collection_dict: dict):
+        """
+        Writes the provenance information of a first stage run
+        :param path: path of the store (without file extension)
+        :param pos2prov_collection_dict: collection -> topic -> document -> query idx -> position -> prov ids
+        :return: None
+        """
+        index = dict()
+        offset = 0
+        with open(path + '.bin', 'wb') as f:
+            for collection, topic2docs in pos2prov_collection_dict.items():
+                index[collection] = dict()
+                for topic, doc2query2pos2prov in topic2docs.items():
+                    topic_start = offset
+                    doc2range = dict()
+                    for doc_id, query2pos2prov in doc2query2pos2prov.items():
+                        data = ProvenanceStore._encode_record(query2pos2prov).tobytes()
+                        f.write(data)
+                        doc2range[str(doc_id)] = (offset, len(data))
+                        offset += len(data)
+                    index[collection][str(topic)] = (topic_start, offset, doc2range)
+
+        with open(path + '.idx', 'wb') as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def convert_json(json_path: str) -> str:
+        """
+        Converts a pos2prov JSON file (written by older first stage runs) into the binary format
+        :param json_path: path to the JSON file
+        :return: path of the store
+        """
+        path = ProvenanceStore.path_for_json(json_path)
+        print(f'Converting {json_path} into binary provenance store...')
+        with open(json_path, 'rt') as f:
+            ProvenanceStore.write(path, json.load(f))
+        return path
+
+    @staticmethod
+    def open_for_json(json_path: str):
+        path = ProvenanceStore.path_for_json(json_path)
+        if not ProvenanceStore.exists(path):
+            ProvenanceStore.convert_json(json_path)
+        return ProvenanceStore(path)
+
+    def has_document(self, collection: str, topic: str, document_id: str) -> bool:
+        if collection not in self.index or str(topic) not in self.index[collection]:
+            return False
+        return str(document_id) in self.index[collection][str(topic)][2]
+
+    def get_document(self, collection: str, topic: str, document_id: str) -> dict:
+        offset, length = self.index[collection][str(topic)][2][str(document_id)]
+        return ProvenanceStore._decode_record(self.__data[offset:offset + length])
+
+    def get_topic(self, collection: str, topic: str) -> dict:
+        topic_start, topic_end, doc2range = self.index[collection][str(topic)]
+        data = self.__data[topic_start:topic_end]
+        return {doc_id: ProvenanceStore._decode_record(data[offset - topic_start:offset - topic_start + length])
+                for doc_id, (offset, length) in doc2range.items()}
@@ -5,18 +5,26 @@ import pandas as pd
 import pyterrier as pt
 
 from narraplay.documentranking.benchmark import Benchmark
-from narraplay.documentranking.config import PYTERRIER_INDEX_PATH
+from narraplay.documentranking.config import PYTERRIER_INDEX_PATH, NATIVE_BM25_PATH
 from narraplay.documentranking.document import AnalyzedNarrativeDocument
+from narraplay.documentranking.rankers.bm25_index_manager import BM25IndexManager, get_delta_index_paths
 from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
 
 
 class BM25ReRankerBase(BaseDocumentRanker):
 
     def __init__(self, name, termpipelines='Stopwords,PorterStemmer'):
-        if not pt.started():
+        from narraplay.documentranking.run_config import USE_NATIVE_BM25
+        # the native scorer only needs the JVM to export the index statistics once
+        self.use_native_bm25 = USE_NATIVE_BM25 and termpipelines == 'Stopwords,PorterStemmer'
+        if not self.use_native_bm25 and not pt.started():
             pt.init()
 
         self.bm25pipeline = None
+        self.native_bm25 = None
+        self.benchmark = None
+        # path of the index that is acquired from the BM25IndexManager
+        self.acquired_index_path = None
         self.termpipelines = termpipelines
 
         super().__init__(name=name)
@@ -25,9 +33,22 @@ class BM25ReRankerBase(BaseDocumentRanker):
         return "".join([x if x.isalnum() else " " for x in query])
 
     def set_benchmark(self, benchmark: Benchmark):
-        index_path = os.path.join(PYTERRIER_INDEX_PATH, benchmark.name)
-        print(f'Load BM25 index from: {index_path}')
-        bm25_index = pt.IndexFactory.of(index_path, memory=True)
+        self.release_benchmark()
+        self.benchmark = benchmark
+        # benchmarks with the same document collections share a master index
+        index_path = os.path.join(PYTERRIER_INDEX_PATH, benchmark.get_index_name())
+        # the native scorer requires a single index (delta indexes are only supported by Terrier)
+        use_native_bm25 = self.use_native_bm25
+        if use_native_bm25 and get_delta_index_paths(index_path):
+            print(f'Delta indexes of {index_path} are not merged - {self.name} uses Terrier for BM25')
+            use_native_bm25 = False
+        if use_native_bm25:
+            self.acquired_index_path = os.path.join(NATIVE_BM25_PATH, benchmark.get_index_name())
+            self.native_bm25 = BM25IndexManager.instance().acquire_native(index_path, self.acquired_index_path)
+            return
+
+        bm25_index = BM25IndexManager.instance().acquire(index_path)
+        self.acquired_index_path = index_path
 
         self.bm25pipeline = pt.BatchRetrieve(
             bm25_index,
@@ -35,23 +56,41 @@ class BM25ReRankerBase(BaseDocumentRanker):
             properties={'termpipelines': self.termpipelines}
         )
 
+    def release_benchmark(self):
+        if self.acquired_index_path:
+            BM25IndexManager.instance().release(self.acquired_index_path)
+        self.acquired_index_path = None
+        self.bm25pipeline = None
+        self.native_bm25 = None
+        self.benchmark = None
+
     def score_with_bm25(self, query: str, documents: List[AnalyzedNarrativeDocument], normalize=True):
         assert len(query.strip()) > 0
         assert len(documents) > 0
 
-        d_texts = []
-        for doc in documents:
-            d_texts.append(["q0", query, doc.document_id_source])
-
-        df = pd.DataFrame(d_texts, columns=["qid", "query", "docno"])
-        rtr = self.bm25pipeline(df)
-
-        scored_docs = []
-        for index, row in rtr.iterrows():
-            # transform document id back to internal representation, e.g. PubMed_123 -> 123
-            scored_docs.append(((row["docno"]), max(float(row["score"]), 0.0)))
-
-        if normalize:
+        # documents outside the benchmark baseline are not scored (they may be part of a master index)
+        documents = [d for d in documents
+                     if self.benchmark.is_document_in_baseline(d.document_id_source, d.collection)]
+        if not documents:
+            return []
+
+        if self.native_bm25 is not None:
+            scored_docs = [(docno, max(score, 0.0))
+                           for docno, score in self.native_bm25.score(query, [d.document_id_source for d in documents])]
+        else:
+            d_texts = []
+            for doc in documents:
+                d_texts.append(["q0", query, doc.document_id_source])
+
+            df = pd.DataFrame(d_texts, columns=["qid", "query", "docno"])
+            rtr = self.bm25pipeline(df)
+
+            scored_docs = []
+            for index, row in rtr.iterrows():
+                # transform document id back to internal representation, e.g. PubMed_123 -> 123
+                scored_docs.append(((row["docno"]), max(float(row["score"]), 0.0)))
+
+        if normalize and scored_docs:
             # apply normalization
             max_score = max(sd[1] for sd in scored_docs)
             if max_score > 0.0:
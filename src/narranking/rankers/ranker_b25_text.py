@@ -11,6 +11,10 @@ class BM25Text(BM25ReRankerBase):
         super().__init__(name=name)
 
     def rank_documents(self, query: AnalyzedQuery, narrative_documents: List[AnalyzedNarrativeDocument],
-                       corpus: DocumentCorpus, fragments: list) -> List[Tuple[str, float]]:
+                       corpus: DocumentCorpus, fragments: list,
+                       features: list = None, top_k: int = 0) -> List[Tuple[str, float]]:
         query_str = self.filter_query_string(query.topic.get_benchmark_string())
-        return self.score_with_bm25(query_str, narrative_documents)
+        ranked_docs = self.score_with_bm25(query_str, narrative_documents)
+        if 0 < top_k < len(ranked_docs):
+            return BM25ReRankerBase.keep_top_k(ranked_docs, top_k)
+        return ranked_docs
@@ -1,5 +1,8 @@
+import heapq
 from abc import abstractmethod
-from typing import List, Tuple
+from typing import List, Tuple, Optional
+
+import numpy as np
 
 from narraplay.documentranking.benchmark import Benchmark
 from narraplay.documentranking.corpus import DocumentCorpus
@@ -44,51 +47,166 @@ class BaseDocumentRanker:
     def set_benchmark(self, benchmark: Benchmark):
         pass
 
-    def rank_documents(self, query: AnalyzedQuery, narrative_documents: List[AnalyzedNarrativeDocument],
-                       corpus: DocumentCorpus, fragments: list) -> List[Tuple[str, float]]:
+    def release_benchmark(self):
+        """
+        Releases the resources of the current benchmark (e.g., shared indexes)
+        """
+        pass
 
-        max_fragment_score = 0.0
-        scored_document_fragments = []
-        for doc, d_fragments in zip(narrative_documents, fragments):
-            scored_fragments = self.rank_document(query, doc, corpus, d_fragments)
-            # find the maximum overall document score
-            max_fragment_score = max(max_fragment_score, max(sf.score for sf in scored_fragments))
+    def get_statement_upper_bound(self, doc: AnalyzedNarrativeDocument, corpus: DocumentCorpus,
+                                  spo: tuple) -> Optional[float]:
+        """
+        Upper bound of the score of every fragment that contains the statement (before normalization and
+        translation scores, which are <= 1). Fragments can then be enumerated in descending bound order,
+        i.e., a capped enumeration keeps the best fragments of this ranker (see run_config.FRAGMENT_UPPER_BOUND_RANKER)
+        :return: the upper bound or None if the ranker does not provide a bound
+        """
+        return None
 
-            scored_document_fragments.append(scored_fragments)
+    def rank_documents(self, query: AnalyzedQuery, narrative_documents: List[AnalyzedNarrativeDocument],
+                       corpus: DocumentCorpus, fragments: list, features: list = None,
+                       top_k: int = 0) -> List[Tuple[str, float]]:
+        lengths, doc_scores, doc_translation_scores = self.score_documents(query, narrative_documents, corpus,
+                                                                           fragments, features)
+        return BaseDocumentRanker.aggregate_fragment_scores(narrative_documents, lengths, doc_scores,
+                                                            doc_translation_scores, top_k=top_k)
+
+    def score_documents(self, query: AnalyzedQuery, narrative_documents: List[AnalyzedNarrativeDocument],
+                        corpus: DocumentCorpus, fragments: list, features: list = None):
+        """
+        Computes the raw (not normalized) fragment scores of all documents
+        :return: number of fragments per document, the fragment scores and translation scores of all documents
+                 with at least one fragment (in document order)
+        """
+        # the fragments of document i are stored in [offsets[i], offsets[i] + lengths[i])
+        lengths = np.zeros(len(narrative_documents), dtype=np.int64)
+        doc_scores, doc_translation_scores = [], []
+        for idx, (doc, d_fragments) in enumerate(zip(narrative_documents, fragments)):
+            # documents that do not match the query graph (e.g., in-memory matching) do not have fragments
+            if len(d_fragments) == 0:
+                continue
+            d_features = features[idx] if features else None
+            scores, translation_scores = self.rank_document_arrays(query, doc, corpus, d_fragments, d_features)
+            lengths[idx] = len(scores)
+            doc_scores.append(scores)
+            doc_translation_scores.append(translation_scores)
+        return lengths, doc_scores, doc_translation_scores
 
-        # next normalize all document scores by the maximum score
-        # and compute the final document score
-        results = list()
+    @staticmethod
+    def aggregate_fragment_scores(narrative_documents: List[AnalyzedNarrativeDocument], lengths: np.ndarray,
+                                  doc_scores: List[np.ndarray],
+                                  doc_translation_scores: List[np.ndarray], top_k: int = 0) -> List[Tuple[str, float]]:
+        """
+        Normalizes all fragment scores by the maximum fragment score, multiplies them with their translation
+        scores and takes the best fragment per document
+        :param narrative_documents: the ranked documents
+        :param lengths: number of fragments per document
+        :param doc_scores: the raw fragment scores of all documents with at least one fragment (in document order)
+        :param doc_translation_scores: the fragment translation scores (aligned with doc_scores)
+        :param top_k: only return the k best documents (0 = all documents)
+        :return: a list of (document id, score) sorted by score and document id (descending)
+        """
+        if doc_scores:
+            scores = np.concatenate(doc_scores).astype(np.float64, copy=False)
+            translation_scores = np.concatenate(doc_translation_scores).astype(np.float64, copy=False)
+        else:
+            scores = np.zeros(0, dtype=np.float64)
+            translation_scores = np.zeros(0, dtype=np.float64)
+
+        # find the maximum overall fragment score
+        max_fragment_score = float(np.max(scores, initial=0.0))
         assert 0.0 <= max_fragment_score
-        for doc, scored_fragments in zip(narrative_documents, scored_document_fragments):
-            doc_fragment_scores = []
-            for scored_fragment in scored_fragments:
-                # normalize the fragment score * translation score
-                if max_fragment_score > 0.0:
-                    d_fragment_score = (scored_fragment.score / max_fragment_score) * scored_fragment.translation_score
-                else:
-                    d_fragment_score = scored_fragment.score * scored_fragment.translation_score
 
-                doc_fragment_scores.append(d_fragment_score)
+        # normalize the fragment score * translation score
+        if max_fragment_score > 0.0:
+            fragment_scores = (scores / max_fragment_score) * translation_scores
+        else:
+            fragment_scores = scores * translation_scores
+
+        # take the maximum (best scored fragment) as the score for each document
+        document_scores = np.zeros(len(narrative_documents), dtype=np.float64)
+        has_fragments = lengths > 0
+        if len(fragment_scores) > 0:
+            offsets = np.cumsum(lengths) - lengths
+            document_scores[has_fragments] = np.maximum.reduceat(fragment_scores, offsets[has_fragments])
 
-            # take the maximum (best scored fragment) as the score for this document
-            score = max(doc_fragment_scores)
+        # check that the scores are between 0.0 and 1.0
+        assert np.all((0.0 <= document_scores) & (document_scores <= 1.0))
 
-            # check that the score is between 0.0 and 1.0
-            assert 0.0 <= score <= 1.0
-            results.append((doc.document_id_source, score))
+        # Sort documents by their score and then their id (both descending)
+        document_ids = np.array([doc.document_id_source for doc in narrative_documents], dtype=str)
+        order = BaseDocumentRanker.select_top_k(document_ids, document_scores, top_k)
+        document_scores = document_scores.tolist()
+        return [(narrative_documents[i].document_id_source, document_scores[i]) for i in order.tolist()]
 
-        # Sort documents by their score and then their id
-        results.sort(key=lambda x: (x[1], x[0]), reverse=True)
-        return results
+    @staticmethod
+    def select_top_k(document_ids: np.ndarray, scores: np.ndarray, k: int = 0) -> np.ndarray:
+        """
+        Selects the k best documents by (score, document id) in descending order
+        :param document_ids: the document ids
+        :param scores: the document scores (aligned with document_ids)
+        :param k: number of documents to select (0 = all documents)
+        :return: the indexes of the selected documents in ranking order
+        """
+        if k <= 0 or k >= len(scores):
+            return np.lexsort((document_ids, scores))[::-1]
+
+        # the k-th best score is the threshold; all documents tied with it remain candidates,
+        # so that ties are broken by the document id as in a full sort
+        threshold = scores[np.argpartition(scores, len(scores) - k)[len(scores) - k]]
+        candidates = np.flatnonzero(scores >= threshold)
+        order = np.lexsort((document_ids[candidates], scores[candidates]))[::-1][:k]
+        return candidates[order]
+
+    @staticmethod
+    def keep_top_k(ranked_docs: List[Tuple[str, float]], k: int = 0) -> List[Tuple[str, float]]:
+        """
+        Sorts (document id, score) pairs by score and document id (descending) and keeps the k best
+        :param ranked_docs: a list of (document id, score)
+        :param k: number of documents to keep (0 = all documents)
+        :return: the sorted list
+        """
+        if 0 < k < len(ranked_docs):
+            return heapq.nlargest(k, ranked_docs, key=lambda x: (x[1], x[0]))
+        return sorted(ranked_docs, key=lambda x: (x[1], x[0]), reverse=True)
+
+    def rank_document_arrays(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument, corpus: DocumentCorpus,
+                             fragments: list, features=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores all fragments of a document
+        :return: an array of raw fragment scores and an array of fragment translation scores
+        """
+        from narraplay.documentranking.run_config import USE_FRAGMENT_TRANSLATION_SCORE
+        if len(fragments) == 0:
+            raise ValueError("No fragments")
+
+        # rankers that support the feature matrix aggregate precomputed base quantities
+        if features is not None:
+            fragment_scores = self.rank_document_features(query, doc, corpus, features)
+            if fragment_scores is not None:
+                if USE_FRAGMENT_TRANSLATION_SCORE:
+                    translation_scores = features.translation_scores()
+                else:
+                    translation_scores = np.ones(len(fragments), dtype=np.float64)
+                return fragment_scores, translation_scores
+
+        scored_fragments = self.rank_document(query, doc, corpus, fragments)
+        return (np.array([sf.score for sf in scored_fragments], dtype=np.float64),
+                np.array([sf.translation_score for sf in scored_fragments], dtype=np.float64))
 
     def rank_document(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
-                      corpus: DocumentCorpus, fragments: list) -> List[ScoredDocumentFragment]:
+                      corpus: DocumentCorpus, fragments: list, features=None) -> List[ScoredDocumentFragment]:
+        if features is not None:
+            scores, translation_scores = self.rank_document_arrays(query, doc, corpus, fragments, features)
+            return [ScoredDocumentFragment(score, translation_score)
+                    for score, translation_score in zip(scores.tolist(), translation_scores.tolist())]
+
+        from narraplay.documentranking.run_config import USE_FRAGMENT_TRANSLATION_SCORE
         scores = list()
         if len(fragments) == 0:
             raise ValueError("No fragments")
+
         for fragment in fragments:
-            from narraplay.documentranking.run_config import USE_FRAGMENT_TRANSLATION_SCORE
             if USE_FRAGMENT_TRANSLATION_SCORE:
                 scores.append(ScoredDocumentFragment(self.rank_document_fragment(query, doc, corpus, fragment),
                                                      BaseDocumentRanker.get_fragment_translation_score(fragment,
@@ -98,6 +216,14 @@ class BaseDocumentRanker:
                                                      1.0))
         return scores
 
+    def rank_document_features(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument, corpus: DocumentCorpus,
+                               features) -> Optional[np.ndarray]:
+        """
+        Scores all fragments of a document by aggregating its feature matrix (see feature_engine)
+        :return: an array with one score per fragment or None if the ranker does not support features
+        """
+        return None
+
     @abstractmethod
     def rank_document_fragment(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument, corpus: DocumentCorpus,
                                fragment: list):
@@ -105,27 +231,23 @@ class BaseDocumentRanker:
 
     @staticmethod
     def get_tf_idf(statement: tuple, doc: AnalyzedNarrativeDocument, corpus: DocumentCorpus):
-        tf_s = doc.concept2frequency[statement[0]] / doc.max_concept_frequency
-        tf_o = doc.concept2frequency[statement[2]] / doc.max_concept_frequency
-        idf_s = corpus.get_concept_ifd_score(statement[0])
-        idf_o = corpus.get_concept_ifd_score(statement[2])
-
-        return ((tf_s * idf_s) + (tf_o * idf_o)) * PREDICATE_TO_SCORE[statement[1]]
+        # memoized per document (reset in prepare_with_min_confidence)
+        if statement not in doc.spo2tf_idf:
+            tf_idf_s = BaseDocumentRanker.get_concept_tf_idf(statement[0], doc=doc, corpus=corpus)
+            tf_idf_o = BaseDocumentRanker.get_concept_tf_idf(statement[2], doc=doc, corpus=corpus)
+            doc.spo2tf_idf[statement] = (tf_idf_s + tf_idf_o) * PREDICATE_TO_SCORE[statement[1]]
+        return doc.spo2tf_idf[statement]
 
     @staticmethod
     def get_concept_tf_idf(entity_id: str, doc: AnalyzedNarrativeDocument, corpus: DocumentCorpus):
-        tf = doc.concept2frequency[entity_id] / doc.max_concept_frequency
-        idf = corpus.get_concept_ifd_score(entity_id)
-        return tf * idf
+        # memoized per document (reset in prepare_with_min_confidence)
+        if entity_id not in doc.concept2tf_idf:
+            tf = doc.concept2frequency[entity_id] / doc.max_concept_frequency
+            idf = corpus.get_concept_ifd_score(entity_id)
+            doc.concept2tf_idf[entity_id] = tf * idf
+        return doc.concept2tf_idf[entity_id]
 
     @staticmethod
     def get_fragment_translation_score(fragment: List[tuple], query: AnalyzedQuery):
-        # the fragment is only as good as it weakest translation
-        scores = []
-        for statement in fragment:
-            scores.append(query.concept2score[statement[0]])
-            scores.append(query.concept2score[statement[2]])
-
-        min_score = min(scores)
-        assert 0.0 <= min_score <= 1.0
-        return min_score
+        # memoized per distinct fragment on the query
+        return query.get_fragment_translation_score(fragment)
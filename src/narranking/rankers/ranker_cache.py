@@ -0,0 +1,171 @@
+import hashlib
+import inspect
+import json
+import os
+import sys
+
+import narraplay.documentranking.corpus
+import narraplay.documentranking.document
+import narraplay.documentranking.query
+import narraplay.documentranking.rankers.bm25_native
+import narraplay.documentranking.rankers.connectivity_index
+import narraplay.documentranking.rankers.feature_engine
+import narraplay.documentranking.rankers.fragment_enumerator
+import narraplay.documentranking.rankers.graph_fragment
+import narraplay.documentranking.rankers.graph_matcher
+import narraplay.documentranking.rankers.neighbour_index
+import narraplay.documentranking.rankers.ranker_base
+from narraplay.documentranking.config import RANKER_CACHE_DIR, MINIMUM_TRANSLATION_THRESHOLD, USE_MASTER_INDEX
+from narraplay.documentranking.corpus import DocumentCorpus
+from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.bm25_index_manager import get_delta_index_paths
+from narraplay.documentranking.rankers.bm25_native import NativeBM25Index
+from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
+
+# modules that are used by all rankers (their code is part of every ranker version)
+SHARED_MODULES = [
+    narraplay.documentranking.corpus,
+    narraplay.documentranking.document,
+    narraplay.documentranking.query,
+    narraplay.documentranking.rankers.bm25_native,
+    narraplay.documentranking.rankers.connectivity_index,
+    narraplay.documentranking.rankers.feature_engine,
+    narraplay.documentranking.rankers.fragment_enumerator,
+    narraplay.documentranking.rankers.graph_fragment,
+    narraplay.documentranking.rankers.graph_matcher,
+    narraplay.documentranking.rankers.neighbour_index,
+    narraplay.documentranking.rankers.ranker_base
+]
+
+
+class RankerResultCache:
+    """
+    Caches the result lines of each ranker per topic of a run (benchmark, first stage and concept strategy)
+
+    A cache entry is only used if its key matches, i.e., the hash of
+    - the first stage candidates with their scores and the query translation (topic key)
+    - the source code of the ranker (all modules of its class hierarchy and the shared modules)
+    - the run configuration that influences the ranking
+    - the state of the document data (document counts and maximum ids of the corpus collections, versions of the
+      BM25 index and its delta indexes), i.e., corpus deltas and index appends invalidate the cache
+    """
+
+    def __init__(self, benchmark_name: str, first_stage: str, concept_strategy: str, data_values: dict = None,
+                 cache_dir: str = RANKER_CACHE_DIR):
+        """
+        :param data_values: the state of the document data (see get_data_values)
+        """
+        self.path = os.path.join(cache_dir, f'{benchmark_name}_{first_stage}_{concept_strategy}')
+        self.data_values = data_values
+        self.__ranker2version = dict()
+        self.__statistics_version = None
+
+    @staticmethod
+    def hash_object(obj) -> str:
+        return hashlib.sha256(json.dumps(obj, sort_keys=True).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get_config_values() -> dict:
+        from narraplay.documentranking.run_config import USE_FRAGMENT_TRANSLATION_SCORE, \
+            MAX_FRAGMENTS_PER_DOCUMENT, FRAGMENT_SOURCE, RANKING_TOP_K, IGNORE_DEMOGRAPHIC, USE_NATIVE_BM25, \
+            FRAGMENT_UPPER_BOUND_RANKER
+        from narraplay.documentranking.entity_tagger_like import CONCEPT_TRANSLATION_SIMILARITY
+        return dict(use_fragment_translation_score=USE_FRAGMENT_TRANSLATION_SCORE,
+                    max_fragments_per_document=MAX_FRAGMENTS_PER_DOCUMENT,
+                    fragment_source=FRAGMENT_SOURCE,
+                    fragment_upper_bound_ranker=FRAGMENT_UPPER_BOUND_RANKER,
+                    ranking_top_k=RANKING_TOP_K,
+                    ignore_demographic=IGNORE_DEMOGRAPHIC,
+                    use_native_bm25=USE_NATIVE_BM25,
+                    use_master_index=USE_MASTER_INDEX,
+                    minimum_translation_threshold=MINIMUM_TRANSLATION_THRESHOLD,
+                    concept_translation_similarity=CONCEPT_TRANSLATION_SIMILARITY)
+
+    @staticmethod
+    def get_data_values(corpus: DocumentCorpus, index_path: str) -> dict:
+        """
+        :param corpus: the document corpus of the benchmark
+        :param index_path: path of the BM25 index of the benchmark
+        :return: the state of the document data that the rankers read
+        """
+        index_versions = []
+        if os.path.isdir(index_path):
+            index_versions = [[os.path.basename(path), NativeBM25Index.get_index_version(path)]
+                              for path in [index_path] + get_delta_index_paths(index_path)]
+        return dict(collection2count={str(c): n for c, n in corpus.collection2count.items()},
+                    collection2max_id={str(c): i for c, i in corpus.collection2max_id.items()},
+                    bm25_index_versions=index_versions)
+
+    def get_ranker_version(self, ranker: BaseDocumentRanker) -> str:
+        if ranker.name not in self.__ranker2version:
+            modules = [sys.modules[cls.__module__] for cls in type(ranker).__mro__ if cls is not object]
+            source_files = sorted({inspect.getsourcefile(m) for m in modules + SHARED_MODULES})
+            h = hashlib.sha256()
+            for source_file in source_files:
+                with open(source_file, 'rb') as f:
+                    h.update(f.read())
+            h.update(RankerResultCache.hash_object(RankerResultCache.get_config_values()).encode('utf-8'))
+            h.update(RankerResultCache.hash_object(self.data_values).encode('utf-8'))
+            self.__ranker2version[ranker.name] = h.hexdigest()
+        return self.__ranker2version[ranker.name]
+
+    def get_statistics_version(self) -> str:
+        # query statistics are computed by the query module on the document objects
+        if self.__statistics_version is None:
+            h = hashlib.sha256()
+            for module in [narraplay.documentranking.document, narraplay.documentranking.query]:
+                with open(inspect.getsourcefile(module), 'rb') as f:
+                    h.update(f.read())
+            h.update(RankerResultCache.hash_object(self.data_values).encode('utf-8'))
+            self.__statistics_version = h.hexdigest()
+        return self.__statistics_version
+
+    @staticmethod
+    def get_topic_key(fs_docs_with_scores: list, analyzed_query: AnalyzedQuery) -> str:
+        return RankerResultCache.hash_object(dict(
+            candidates=sorted([str(d), s] for d, s in fs_docs_with_scores),
+            concept2score=sorted(analyzed_query.concept2score.items()),
+            component2concepts={c: sorted(concepts) for c, concepts in analyzed_query.component2concepts.items()}
+        ))
+
+    def __get_topic_path(self, topic_id) -> str:
+        return os.path.join(self.path, str(topic_id))
+
+    def __load(self, path: str, key: str):
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'rt') as f:
+            entry = json.load(f)
+        if entry["key"] != key:
+            return None
+        return entry["value"]
+
+    def __store(self, path: str, key: str, value):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wt') as f:
+            json.dump(dict(key=key, value=value), f)
+        os.replace(tmp_path, path)
+
+    def load_result_lines(self, topic_id, topic_key: str, ranker: BaseDocumentRanker):
+        """
+        :return: the cached result lines of the ranker for this topic or None if not cached
+        """
+        path = os.path.join(self.__get_topic_path(topic_id), f'{ranker.name}.json')
+        return self.__load(path, topic_key + self.get_ranker_version(ranker))
+
+    def store_result_lines(self, topic_id, topic_key: str, ranker: BaseDocumentRanker, result_lines: list):
+        path = os.path.join(self.__get_topic_path(topic_id), f'{ranker.name}.json')
+        self.__store(path, topic_key + self.get_ranker_version(ranker), result_lines)
+
+    def load_topic_statistics(self, topic_id, topic_key: str):
+        """
+        :return: the cached query statistics and number of documents of this topic or None if not cached
+        """
+        path = os.path.join(self.__get_topic_path(topic_id), 'statistics.json')
+        return self.__load(path, topic_key + self.get_statistics_version())
+
+    def store_topic_statistics(self, topic_id, topic_key: str, statistics: dict, no_documents: int):
+        path = os.path.join(self.__get_topic_path(topic_id), 'statistics.json')
+        self.__store(path, topic_key + self.get_statistics_version(),
+                     dict(statistics=statistics, no_documents=no_documents))
@@ -1,6 +1,7 @@
 from narraplay.documentranking.corpus import DocumentCorpus
 from narraplay.documentranking.document import AnalyzedNarrativeDocument
 from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.feature_engine import DocumentFragmentFeatures
 from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
 
 
@@ -14,3 +15,7 @@ class ConfidenceAvgDocumentRanker(BaseDocumentRanker):
         for s, p, o in fragment:
             scores.append(sum(doc.spo2confidences[(s, p, o)]) / len(doc.spo2confidences[(s, p, o)]))
         return min(scores)
+
+    def rank_document_features(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
+                               corpus: DocumentCorpus, features: DocumentFragmentFeatures):
+        return features.min("confidence_avg")
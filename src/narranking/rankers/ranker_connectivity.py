@@ -1,6 +1,8 @@
 from narraplay.documentranking.corpus import DocumentCorpus
 from narraplay.documentranking.document import AnalyzedNarrativeDocument
 from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.connectivity_index import ConnectivityIndex
+from narraplay.documentranking.rankers.feature_engine import DocumentFragmentFeatures
 from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
 
 
@@ -10,17 +12,8 @@ class ConnectivityDocumentRanker(BaseDocumentRanker):
 
     def rank_document_fragment(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
                                corpus: DocumentCorpus, fragment: list):
-        nodes = set()
-        for s, _, o in fragment:
-            nodes.add(s)
-            nodes.add(o)
+        return ConnectivityIndex.of(doc).get_connectivity(fragment)
 
-        counter = 0
-        for s, _, o in doc.graph:
-            # don't count edges between the fragment
-            if s in nodes and o in nodes:
-                continue
-            if s in nodes or o in nodes:
-                counter += 1
-
-        return counter
+    def rank_document_features(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
+                               corpus: DocumentCorpus, features: DocumentFragmentFeatures):
+        return features.fragment_column("connectivity")
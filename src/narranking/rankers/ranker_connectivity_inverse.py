@@ -1,6 +1,9 @@
+import numpy as np
+
 from narraplay.documentranking.corpus import DocumentCorpus
 from narraplay.documentranking.document import AnalyzedNarrativeDocument
 from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.feature_engine import DocumentFragmentFeatures
 from narraplay.documentranking.rankers.ranker_connectivity import ConnectivityDocumentRanker
 
 
@@ -14,3 +17,10 @@ class ConnectivityInverseDocumentRanker(ConnectivityDocumentRanker):
         if no_connected_components == 0:
             return 0.0
         return 1.0 / no_connected_components
+
+    def rank_document_features(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
+                               corpus: DocumentCorpus, features: DocumentFragmentFeatures):
+        no_connected_components = super().rank_document_features(query, doc, corpus, features)
+        scores = np.zeros(len(no_connected_components), dtype=np.float64)
+        np.divide(1.0, no_connected_components, out=scores, where=no_connected_components != 0)
+        return scores
@@ -1,6 +1,7 @@
 from narraplay.documentranking.corpus import DocumentCorpus
 from narraplay.documentranking.document import AnalyzedNarrativeDocument
 from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.feature_engine import DocumentFragmentFeatures
 from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
 from narraplay.documentranking.rankers.ranker_connectivity import ConnectivityDocumentRanker
 
@@ -12,3 +13,7 @@ class ConnectivityNormalizedDocumentRanker(ConnectivityDocumentRanker):
     def rank_document_fragment(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
                                corpus: DocumentCorpus, fragment: list):
         return super().rank_document_fragment(query, doc, corpus, fragment) / len(doc.graph)
+
+    def rank_document_features(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
+                               corpus: DocumentCorpus, features: DocumentFragmentFeatures):
+        return super().rank_document_features(query, doc, corpus, features) / len(doc.graph)
@@ -1,6 +1,7 @@
 from narraplay.documentranking.corpus import DocumentCorpus
 from narraplay.documentranking.document import AnalyzedNarrativeDocument
 from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.feature_engine import DocumentFragmentFeatures
 from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
 
 
@@ -17,3 +18,7 @@ class ConceptCoverageDocumentRanker(BaseDocumentRanker):
 
         scores = [doc.get_concept_coverage(c) for c in concepts]
         return min(scores)
+
+    def rank_document_features(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
+                               corpus: DocumentCorpus, features: DocumentFragmentFeatures):
+        return features.min("coverage")
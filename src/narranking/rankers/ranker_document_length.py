@@ -12,12 +12,12 @@ class DocLengthDocumentRanker(BaseDocumentRanker):
         super().__init__(name="DocLengthDocumentRanker")
 
     def rank_documents(self, query: AnalyzedQuery, narrative_documents: List[AnalyzedNarrativeDocument],
-                       corpus: DocumentCorpus, fragments: list) -> List[Tuple[str, float]]:
+                       corpus: DocumentCorpus, fragments: list,
+                       features: list = None, top_k: int = 0) -> List[Tuple[str, float]]:
         max_length = max(len(d.graph) for d in narrative_documents)
 
         results = list()
         for doc, d_fragments in zip(narrative_documents, fragments):
             score = len(doc.graph) / max_length
             results.append((doc.document_id_source, score))
-        results.sort(key=lambda x: (x[1], x[0]), reverse=True)
-        return results
+        return BaseDocumentRanker.keep_top_k(results, top_k)
@@ -12,5 +12,8 @@ class EqualDocumentRanker(BaseDocumentRanker):
         super().__init__(name="EqualDocumentRanker")
 
     def rank_documents(self, query: AnalyzedQuery, narrative_documents: List[AnalyzedNarrativeDocument],
-                       corpus: DocumentCorpus, fragments: list):
-        return list([(d.document_id_source, 1.0) for d in narrative_documents])
+                       corpus: DocumentCorpus, fragments: list, features: list = None, top_k: int = 0):
+        ranked_docs = list([(d.document_id_source, 1.0) for d in narrative_documents])
+        if 0 < top_k < len(ranked_docs):
+            return BaseDocumentRanker.keep_top_k(ranked_docs, top_k)
+        return ranked_docs
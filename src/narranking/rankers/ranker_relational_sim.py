@@ -1,8 +1,10 @@
-import itertools
+import numpy as np
 
 from narraplay.documentranking.corpus import DocumentCorpus
 from narraplay.documentranking.document import AnalyzedNarrativeDocument
 from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.feature_engine import DocumentFragmentFeatures
+from narraplay.documentranking.rankers.neighbour_index import NeighbourEdgeIndex
 from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
 
 
@@ -12,28 +14,10 @@ class RelationalSimDocumentRanker(BaseDocumentRanker):
 
     @staticmethod
     def get_relational_similarity_scores(doc: AnalyzedNarrativeDocument, corpus: DocumentCorpus, fragment: list):
+        index = NeighbourEdgeIndex.of(doc, corpus)
         scores = list()
         for spo in fragment:
-
-            visited = set()
-            for statement in itertools.chain(doc.concept2statement[spo[0]], doc.concept2statement[spo[2]]):
-                # iterate over each edge once
-                n_spo = (statement.subject_id, statement.relation, statement.object_id)
-                if n_spo in visited:
-                    continue
-                visited.add(n_spo)
-
-                # skip edges between the fragment
-                if n_spo[0] == spo[0] and n_spo[2] == spo[2]:
-                    continue
-
-                # neighbour edge = edge that is connected to the fragment via subject or object
-                if n_spo[0] == spo[0] or n_spo[2] == spo[2]:
-                    tf_idf = BaseDocumentRanker.get_tf_idf(statement=n_spo, doc=doc, corpus=corpus)
-                    confidence = max(doc.spo2confidences[n_spo])
-                    coverage = min(doc.get_concept_coverage(n_spo[0]), doc.get_concept_frequency(n_spo[2]))
-                    score = confidence * tf_idf * coverage
-                    scores.append(score)
+            scores.extend(index.get_relational_sim_scores(spo))
 
         # we might do not have neighbour edges
         if len(scores) == 0:
@@ -46,3 +30,9 @@ class RelationalSimDocumentRanker(BaseDocumentRanker):
 
         scores = RelationalSimDocumentRanker.get_relational_similarity_scores(doc, corpus, fragment)
         return sum(scores)
+
+    def rank_document_features(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
+                               corpus: DocumentCorpus, features: DocumentFragmentFeatures):
+        # we might do not have neighbour edges
+        return np.array([sum(scores) if scores else 0.0 for scores in features.fragment_lists("relational_sim")],
+                        dtype=np.float64)
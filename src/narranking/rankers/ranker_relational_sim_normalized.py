@@ -1,8 +1,9 @@
-import itertools
+import numpy as np
 
 from narraplay.documentranking.corpus import DocumentCorpus
 from narraplay.documentranking.document import AnalyzedNarrativeDocument
 from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.feature_engine import DocumentFragmentFeatures
 from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
 from narraplay.documentranking.rankers.ranker_relational_sim import RelationalSimDocumentRanker
 
@@ -15,3 +16,9 @@ class RelationalSimNormalizedDocumentRanker(RelationalSimDocumentRanker):
                                corpus: DocumentCorpus, fragment: list):
         scores = RelationalSimDocumentRanker.get_relational_similarity_scores(doc, corpus, fragment)
         return sum(scores) / len(scores)
+
+    def rank_document_features(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
+                               corpus: DocumentCorpus, features: DocumentFragmentFeatures):
+        # we might do not have neighbour edges
+        return np.array([sum(scores) / len(scores) if scores else 0.0
+                         for scores in features.fragment_lists("relational_sim")], dtype=np.float64)
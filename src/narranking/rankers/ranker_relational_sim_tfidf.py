@@ -1,8 +1,10 @@
-import itertools
+import numpy as np
 
 from narraplay.documentranking.corpus import DocumentCorpus
 from narraplay.documentranking.document import AnalyzedNarrativeDocument
 from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.feature_engine import DocumentFragmentFeatures
+from narraplay.documentranking.rankers.neighbour_index import NeighbourEdgeIndex
 from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
 
 
@@ -12,30 +14,19 @@ class RelationalSimTFIDFDocumentRanker(BaseDocumentRanker):
 
     def rank_document_fragment(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
                                corpus: DocumentCorpus, fragment: list):
+        index = NeighbourEdgeIndex.of(doc, corpus)
         scores = list()
         for spo in fragment:
-
-            visited = set()
-            for statement in itertools.chain(doc.concept2statement[spo[0]], doc.concept2statement[spo[2]]):
-                # iterate over each edge once
-                n_spo = (statement.subject_id, statement.relation, statement.object_id)
-                if n_spo in visited:
-                    continue
-                visited.add(n_spo)
-
-                # skip edges between the fragment
-                if n_spo[0] == spo[0] and n_spo[2] == spo[2]:
-                    continue
-
-                # neighbour edge = edge that is connected to the fragment via subject or object
-                if n_spo[0] == spo[0] or n_spo[2] == spo[2]:
-                    tf_idf = BaseDocumentRanker.get_tf_idf(statement=n_spo, doc=doc, corpus=corpus)
-
-                    score = tf_idf
-                    scores.append(score)
+            scores.extend(index.get_tf_idf_scores(spo))
 
         # we might do not have neighbour edges
         if len(scores) == 0:
             return 0.0
 
         return sum(scores) / len(scores)
+
+    def rank_document_features(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
+                               corpus: DocumentCorpus, features: DocumentFragmentFeatures):
+        # we might do not have neighbour edges
+        return np.array([sum(scores) / len(scores) if scores else 0.0
+                         for scores in features.fragment_lists("relational_sim_tf_idf")], dtype=np.float64)
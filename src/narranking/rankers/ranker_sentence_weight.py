@@ -1,6 +1,7 @@
 from narraplay.documentranking.corpus import DocumentCorpus
 from narraplay.documentranking.document import AnalyzedNarrativeDocument
 from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.feature_engine import DocumentFragmentFeatures
 from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
 
 
@@ -11,12 +12,10 @@ class SentenceWeightRanker(BaseDocumentRanker):
     def rank_document_fragment(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
                                corpus: DocumentCorpus, fragment: list):
 
-        fragment_weights = []
-        for statement in fragment:
-            statement_weights = []
-            for sentence in doc.spo2sentences[statement]:
-                statement_weights.append(1.0 / len(doc.sentence2spo[sentence]))
-
-            fragment_weights.append(sum(statement_weights) / len(statement_weights))
-
+        # the average sentence weights of the statements are precomputed in prepare_with_min_confidence
+        fragment_weights = [doc.get_sentence_weight(statement) for statement in fragment]
         return sum(fragment_weights) / len(fragment_weights)
+
+    def rank_document_features(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
+                               corpus: DocumentCorpus, features: DocumentFragmentFeatures):
+        return features.mean("sentence_weight")
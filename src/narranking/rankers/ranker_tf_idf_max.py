@@ -1,6 +1,7 @@
 from narraplay.documentranking.corpus import DocumentCorpus
 from narraplay.documentranking.document import AnalyzedNarrativeDocument
 from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.feature_engine import DocumentFragmentFeatures
 from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
 
 
@@ -14,3 +15,11 @@ class TfIdfMaxDocumentRanker(BaseDocumentRanker):
         for spo in fragment:
             scores.append(BaseDocumentRanker.get_tf_idf(statement=spo, doc=doc, corpus=corpus))
         return max(scores)
+
+    def get_statement_upper_bound(self, doc: AnalyzedNarrativeDocument, corpus: DocumentCorpus, spo: tuple):
+        # the fragment score is the maximum statement score
+        return BaseDocumentRanker.get_tf_idf(statement=spo, doc=doc, corpus=corpus)
+
+    def rank_document_features(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
+                               corpus: DocumentCorpus, features: DocumentFragmentFeatures):
+        return features.max("tf_idf")
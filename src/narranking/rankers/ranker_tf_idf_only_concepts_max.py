@@ -1,6 +1,9 @@
+import numpy as np
+
 from narraplay.documentranking.corpus import DocumentCorpus
 from narraplay.documentranking.document import AnalyzedNarrativeDocument
 from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.feature_engine import DocumentFragmentFeatures
 from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
 
 
@@ -18,3 +21,8 @@ class TfIdfOnlyConceptsMaxDocumentRanker(BaseDocumentRanker):
             scores.append(tfidf)
 
         return max(scores)
+
+    def rank_document_features(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
+                               corpus: DocumentCorpus, features: DocumentFragmentFeatures):
+        tfidf = (features.column("subject_tf_idf") + features.column("object_tf_idf")) / 2.0
+        return np.maximum.reduceat(tfidf, features.offsets)
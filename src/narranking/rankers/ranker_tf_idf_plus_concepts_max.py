@@ -1,6 +1,9 @@
+import numpy as np
+
 from narraplay.documentranking.corpus import DocumentCorpus
 from narraplay.documentranking.document import AnalyzedNarrativeDocument
 from narraplay.documentranking.query import AnalyzedQuery
+from narraplay.documentranking.rankers.feature_engine import DocumentFragmentFeatures
 from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
 
 
@@ -19,3 +22,8 @@ class TfIdfPlusConceptsMaxDocumentRanker(BaseDocumentRanker):
             scores.append(tfidf)
 
         return max(scores)
+
+    def rank_document_features(self, query: AnalyzedQuery, doc: AnalyzedNarrativeDocument,
+                               corpus: DocumentCorpus, features: DocumentFragmentFeatures):
+        tfidf = (features.column("tf_idf") + features.column("subject_tf_idf") + features.column("object_tf_idf")) / 3.0
+        return np.maximum.reduceat(tfidf, features.offsets)
@@ -7,7 +7,7 @@ from narraplay.documentranking.benchmark import Benchmark
 from narraplay.documentranking.config import RESULT_DIR, RESULT_DIR_FIRST_STAGE
 from narraplay.documentranking.query import AnalyzedQuery
 from narraplay.documentranking.run_config import WEIGHT_MATRIX, RANKER_BASES, CONCEPT_STRATEGIES, FIRST_STAGE_NAMES, \
-    BENCHMARKS
+    BENCHMARKS, get_result_prefix
 
 
 class WeightedDocumentRanker:
@@ -32,7 +32,8 @@ class WeightedDocumentRanker:
 
     def _load_dependencies(self):
         for ranker in self.rankers:
-            path = os.path.join(RESULT_DIR, f"{self.first_stage}_{self.strategy}", f"{self.benchmark}_{ranker}.txt")
+            path = os.path.join(RESULT_DIR, get_result_prefix(self.first_stage, self.strategy),
+                                f"{self.benchmark}_{ranker}.txt")
             if not os.path.isfile(path):
                 raise FileNotFoundError(f"Result file for {ranker} not found")
             self.results[ranker] = self._read_ranker_results(path)
@@ -111,7 +112,7 @@ def load_document_ids_from_runfile(path_to_runfile):
 
 def run_weighted_ranker(benchmark: Benchmark, weight_matrix: List[List[float]], ranker_bases: List[List[str]], strategy,
                         first_stage, return_results=False):
-    prefix = first_stage + '_' + strategy
+    prefix = get_result_prefix(first_stage, strategy)
     result_dir = os.path.join(RESULT_DIR, prefix)
 
     ranker = WeightedDocumentRanker(benchmark.name, first_stage, strategy)
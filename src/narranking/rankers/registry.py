@@ -0,0 +1,62 @@
+import importlib
+from typing import List
+
+from narraplay.documentranking.rankers.ranker_base import BaseDocumentRanker
+
+RANKER_PACKAGE = "narraplay.documentranking.rankers"
+
+# ranker name -> "module:class" within the ranker package (modules are only imported if the ranker is selected)
+RANKER_REGISTRY = {
+    "ConfidenceDocumentRanker": "ranker_confidence:ConfidenceDocumentRanker",
+    "ConfidenceAvgDocumentRanker": "ranker_confidence_avg:ConfidenceAvgDocumentRanker",
+    "ConfidenceMaxDocumentRanker": "ranker_confidence_max:ConfidenceMaxDocumentRanker",
+    "ConnectivityDocumentRanker": "ranker_connectivity:ConnectivityDocumentRanker",
+    "ConnectivityInverseDocumentRanker": "ranker_connectivity_inverse:ConnectivityInverseDocumentRanker",
+    "ConnectivityNormalizedDocumentRanker": "ranker_connectivity_normalized:ConnectivityNormalizedDocumentRanker",
+    "SentenceWeightRanker": "ranker_sentence_weight:SentenceWeightRanker",
+    "DocLengthDocumentRanker": "ranker_document_length:DocLengthDocumentRanker",
+    "EqualDocumentRanker": "ranker_equal:EqualDocumentRanker",
+    "RelationalSimDocumentRanker": "ranker_relational_sim:RelationalSimDocumentRanker",
+    "RelationalSimTFIDFDocumentRanker": "ranker_relational_sim_tfidf:RelationalSimTFIDFDocumentRanker",
+    "RelationalSimTranslationDocumentRanker": "ranker_relational_sim_translation:RelationalSimTranslationDocumentRanker",
+    "RelationalSimNormalizedDocumentRanker": "ranker_relational_sim_normalized:RelationalSimNormalizedDocumentRanker",
+    "TfIdfAvgDocumentRanker": "ranker_tf_idf_avg:TfIdfAvgDocumentRanker",
+    "TfIdfMinDocumentRanker": "ranker_tf_idf_min:TfIdfMinDocumentRanker",
+    "TfIdfMaxDocumentRanker": "ranker_tf_idf_max:TfIdfMaxDocumentRanker",
+    "TfIdfOnlyConceptsMaxDocumentRanker": "ranker_tf_idf_only_concepts_max:TfIdfOnlyConceptsMaxDocumentRanker",
+    "TfIdfPlusConceptsMaxDocumentRanker": "ranker_tf_idf_plus_concepts_max:TfIdfPlusConceptsMaxDocumentRanker",
+    "TranslationDocumentRanker": "ranker_translation:TranslationDocumentRanker",
+    "TfAvgDocumentRanker": "ranker_tf_avg:TfAvgDocumentRanker",
+    "TfSumDocumentRanker": "ranker_tf_sum:TfSumDocumentRanker",
+    "TfMinDocumentRanker": "ranker_tf_min:TfMinDocumentRanker",
+    "TfMaxDocumentRanker": "ranker_tf_max:TfMaxDocumentRanker",
+    "IDFAvgDocumentRanker": "ranker_idf_avg:IDFAvgDocumentRanker",
+    "IDFSumDocumentRanker": "ranker_idf_sum:IDFSumDocumentRanker",
+    "IDFMaxDocumentRanker": "ranker_idf_max:IDFMaxDocumentRanker",
+    "IDFMinDocumentRanker": "ranker_idf_min:IDFMinDocumentRanker",
+    "ConceptPositionDocumentRanker": "ranker_position:ConceptPositionDocumentRanker",
+    "ConceptCoverageDocumentRanker": "ranker_coverage:ConceptCoverageDocumentRanker",
+    "BM25Text": "ranker_b25_text:BM25Text"
+}
+
+# instances of all loaded rankers (each ranker is created once per process)
+_RANKER_INSTANCES = dict()
+
+
+def load_ranker(name: str) -> BaseDocumentRanker:
+    """
+    Imports and instantiates a registered ranker
+    :param name: the ranker name
+    :return: the ranker instance
+    """
+    if name not in _RANKER_INSTANCES:
+        if name not in RANKER_REGISTRY:
+            raise ValueError(f'Ranker {name} is not registered (known rankers: {list(RANKER_REGISTRY.keys())})')
+        module_name, class_name = RANKER_REGISTRY[name].split(':')
+        ranker_class = getattr(importlib.import_module(f'{RANKER_PACKAGE}.{module_name}'), class_name)
+        _RANKER_INSTANCES[name] = ranker_class()
+    return _RANKER_INSTANCES[name]
+
+
+def load_rankers(names: List[str]) -> List[BaseDocumentRanker]:
+    return [load_ranker(name) for name in names]
@@ -3,36 +3,6 @@ from narraplay.documentranking.config import MINIMUM_TRANSLATION_THRESHOLD
 from narraplay.documentranking.entity_tagger_like import CONCEPT_TRANSLATION_SIMILARITY
 from narraplay.documentranking.first_stages.first_stage_graph import FirstStageGraphRetriever
 from narraplay.documentranking.first_stages.first_stage_partial_graph import FirstStagePartialGraphRetriever
-from narraplay.documentranking.rankers.ranker_b25_text import BM25Text
-from narraplay.documentranking.rankers.ranker_confidence import ConfidenceDocumentRanker
-from narraplay.documentranking.rankers.ranker_confidence_avg import ConfidenceAvgDocumentRanker
-from narraplay.documentranking.rankers.ranker_confidence_max import ConfidenceMaxDocumentRanker
-from narraplay.documentranking.rankers.ranker_connectivity import ConnectivityDocumentRanker
-from narraplay.documentranking.rankers.ranker_connectivity_inverse import ConnectivityInverseDocumentRanker
-from narraplay.documentranking.rankers.ranker_connectivity_normalized import ConnectivityNormalizedDocumentRanker
-from narraplay.documentranking.rankers.ranker_coverage import ConceptCoverageDocumentRanker
-from narraplay.documentranking.rankers.ranker_document_length import DocLengthDocumentRanker
-from narraplay.documentranking.rankers.ranker_equal import EqualDocumentRanker
-from narraplay.documentranking.rankers.ranker_idf_avg import IDFAvgDocumentRanker
-from narraplay.documentranking.rankers.ranker_idf_max import IDFMaxDocumentRanker
-from narraplay.documentranking.rankers.ranker_idf_min import IDFMinDocumentRanker
-from narraplay.documentranking.rankers.ranker_idf_sum import IDFSumDocumentRanker
-from narraplay.documentranking.rankers.ranker_position import ConceptPositionDocumentRanker
-from narraplay.documentranking.rankers.ranker_relational_sim import RelationalSimDocumentRanker
-from narraplay.documentranking.rankers.ranker_relational_sim_normalized import RelationalSimNormalizedDocumentRanker
-from narraplay.documentranking.rankers.ranker_relational_sim_tfidf import RelationalSimTFIDFDocumentRanker
-from narraplay.documentranking.rankers.ranker_relational_sim_translation import RelationalSimTranslationDocumentRanker
-from narraplay.documentranking.rankers.ranker_sentence_weight import SentenceWeightRanker
-from narraplay.documentranking.rankers.ranker_tf_avg import TfAvgDocumentRanker
-from narraplay.documentranking.rankers.ranker_tf_idf_avg import TfIdfAvgDocumentRanker
-from narraplay.documentranking.rankers.ranker_tf_idf_max import TfIdfMaxDocumentRanker
-from narraplay.documentranking.rankers.ranker_tf_idf_min import TfIdfMinDocumentRanker
-from narraplay.documentranking.rankers.ranker_tf_idf_only_concepts_max import TfIdfOnlyConceptsMaxDocumentRanker
-from narraplay.documentranking.rankers.ranker_tf_idf_plus_concepts_max import TfIdfPlusConceptsMaxDocumentRanker
-from narraplay.documentranking.rankers.ranker_tf_max import TfMaxDocumentRanker
-from narraplay.documentranking.rankers.ranker_tf_min import TfMinDocumentRanker
-from narraplay.documentranking.rankers.ranker_tf_sum import TfSumDocumentRanker
-from narraplay.documentranking.rankers.ranker_translation import TranslationDocumentRanker
 
 BENCHMARKS = [
     Benchmark("trec-pm-2020-abstracts", "", ["PubMed"], load_from_file=True),
@@ -56,37 +26,38 @@ FIRST_STAGE_TO_PRINT_NAME = {
     "FirstStagePartialGraphRetriever": "Partial Match"
 }
 
+# names of the rankers that are executed (see rankers/registry.py, rankers are loaded on selection)
 RANKING_STRATEGIES = [
-    ConfidenceDocumentRanker(),
-    ConfidenceAvgDocumentRanker(),
-    ConfidenceMaxDocumentRanker(),
-    ConnectivityDocumentRanker(),
-    ConnectivityInverseDocumentRanker(),
-    ConnectivityNormalizedDocumentRanker(),
-    SentenceWeightRanker(),
-    DocLengthDocumentRanker(),
-    EqualDocumentRanker(),
-    RelationalSimDocumentRanker(),
-    RelationalSimTFIDFDocumentRanker(),
-    RelationalSimTranslationDocumentRanker(),
-    RelationalSimNormalizedDocumentRanker(),
-    TfIdfAvgDocumentRanker(),
-    TfIdfMinDocumentRanker(),
-    TfIdfMaxDocumentRanker(),
-    TfIdfOnlyConceptsMaxDocumentRanker(),
-    TfIdfPlusConceptsMaxDocumentRanker(),
-    TranslationDocumentRanker(),
-    TfAvgDocumentRanker(),
-    TfSumDocumentRanker(),
-    TfMinDocumentRanker(),
-    TfMaxDocumentRanker(),
-    IDFAvgDocumentRanker(),
-    IDFSumDocumentRanker(),
-    IDFMaxDocumentRanker(),
-    IDFMinDocumentRanker(),
-    ConceptPositionDocumentRanker(),
-    ConceptCoverageDocumentRanker(),
-    BM25Text()
+    "ConfidenceDocumentRanker",
+    "ConfidenceAvgDocumentRanker",
+    "ConfidenceMaxDocumentRanker",
+    "ConnectivityDocumentRanker",
+    "ConnectivityInverseDocumentRanker",
+    "ConnectivityNormalizedDocumentRanker",
+    "SentenceWeightRanker",
+    "DocLengthDocumentRanker",
+    "EqualDocumentRanker",
+    "RelationalSimDocumentRanker",
+    "RelationalSimTFIDFDocumentRanker",
+    "RelationalSimTranslationDocumentRanker",
+    "RelationalSimNormalizedDocumentRanker",
+    "TfIdfAvgDocumentRanker",
+    "TfIdfMinDocumentRanker",
+    "TfIdfMaxDocumentRanker",
+    "TfIdfOnlyConceptsMaxDocumentRanker",
+    "TfIdfPlusConceptsMaxDocumentRanker",
+    "TranslationDocumentRanker",
+    "TfAvgDocumentRanker",
+    "TfSumDocumentRanker",
+    "TfMinDocumentRanker",
+    "TfMaxDocumentRanker",
+    "IDFAvgDocumentRanker",
+    "IDFSumDocumentRanker",
+    "IDFMaxDocumentRanker",
+    "IDFMinDocumentRanker",
+    "ConceptPositionDocumentRanker",
+    "ConceptCoverageDocumentRanker",
+    "BM25Text"
 ]
 
 CONCEPT_STRATEGIES = [
@@ -140,6 +111,14 @@ WEIGHT_MATRIX = [
 
 RANKER_BASES = [RANKER_BASE_MIN, RANKER_BASE_AVG, RANKER_BASE_MAX]
 
+# named ranker selections that can be used instead of ranker names (e.g., main.py --rankers RANKER_BASE_MIN)
+RANKER_SELECTIONS = {
+    "RANKING_STRATEGIES": RANKING_STRATEGIES,
+    "RANKER_BASE_MIN": RANKER_BASE_MIN,
+    "RANKER_BASE_AVG": RANKER_BASE_AVG,
+    "RANKER_BASE_MAX": RANKER_BASE_MAX
+}
+
 SKIPPED_TOPICS = {
     "trec-pm-2017-abstracts": [],
     "trec-pm-2018-abstracts": [],
@@ -156,15 +135,57 @@ SKIPPED_TOPICS = {
 IGNORE_DEMOGRAPHIC = False
 USE_FRAGMENT_TRANSLATION_SCORE = True
 FIRST_STAGE_CUTOFF = 0
+# maximum number of fragments per document (0 = unlimited); a cap makes the scores of all rankers approximate,
+# so capped results are written to separate result directories (see get_result_prefix)
+MAX_FRAGMENTS_PER_DOCUMENT = 0
+# ranker that provides statement upper bounds (see BaseDocumentRanker.get_statement_upper_bound, "" = off):
+# fragments are enumerated in descending bound order, so MAX_FRAGMENTS_PER_DOCUMENT keeps the best fragments of
+# this ranker (exact only for this ranker if it is max-based, e.g., 1 for TfIdfMaxDocumentRanker)
+FRAGMENT_UPPER_BOUND_RANKER = ""
+# "provenance": first stage provenance / "matcher": in-memory matching without concept expansion (fewer fragments)
+FRAGMENT_SOURCE = "provenance"
+# number of worker processes that rank the documents of a topic in parallel (0 or 1 = sequential)
+RANKING_WORKERS = 0
+# number of documents per topic that are written to the result files (0 = all documents, > 0 skips weighted rankers)
+RANKING_TOP_K = 0
+# reuse cached ranker results of previous runs (see rankers/ranker_cache.py)
+USE_RANKER_CACHE = True
+# score BM25 re-rankers in-process from exported index statistics instead of PyTerrier (see rankers/bm25_native.py)
+# opt-in: the query processing differs slightly from Terrier (stop word lists), check the parity of the benchmarks
+# with bm25_native_parity.py before enabling it
+USE_NATIVE_BM25 = False
+# load PyTerrier indexes onto the JVM heap instead of reading them from disk (see rankers/bm25_index_manager.py)
+BM25_INDEX_PRELOAD = False
 MINIMUM_COMPONENTS_IN_QUERY = 2
 EVALUATION_SKIP_BAD_TOPICS = True
 JUDGED_DOCS_ONLY_FLAG = True
 
+
+def get_result_prefix(first_stage: str, concept_strategy: str) -> str:
+    """
+    :return: the name of the result directory of a run (runs with a fragment cap are kept apart)
+    """
+    prefix = f'{first_stage}_{concept_strategy}'
+    if MAX_FRAGMENTS_PER_DOCUMENT > 0:
+        prefix += f'_maxfragments{MAX_FRAGMENTS_PER_DOCUMENT}'
+        if FRAGMENT_UPPER_BOUND_RANKER:
+            prefix += f'_{FRAGMENT_UPPER_BOUND_RANKER}'
+    return prefix
+
+
 print('==' * 60)
 print(f'Ignore demographic                     : {IGNORE_DEMOGRAPHIC}')
 print(f'Use document fragment translation score: {USE_FRAGMENT_TRANSLATION_SCORE}')
 print(f'First stage cutoff at                  : {FIRST_STAGE_CUTOFF}')
 print(f'Minimum required components in query   : {MINIMUM_COMPONENTS_IN_QUERY}')
+print(f'Maximum fragments per document         : {MAX_FRAGMENTS_PER_DOCUMENT}')
+print(f'Fragment source                        : {FRAGMENT_SOURCE}')
+print(f'Fragment upper bound ranker            : {FRAGMENT_UPPER_BOUND_RANKER}')
+print(f'Ranking worker processes per topic     : {RANKING_WORKERS}')
+print(f'Top k documents per topic (0 = all)    : {RANKING_TOP_K}')
+print(f'Use ranker result cache                : {USE_RANKER_CACHE}')
+print(f'Use native BM25 scorer                 : {USE_NATIVE_BM25}')
+print(f'Preload BM25 indexes into memory       : {BM25_INDEX_PRELOAD}')
 print(f'Minimum query translation threshold    : {MINIMUM_TRANSLATION_THRESHOLD}')
 print(f'Skip bad topics (translation and comp.): {EVALUATION_SKIP_BAD_TOPICS}')
 print(f'Judged documents only flag             : {JUDGED_DOCS_ONLY_FLAG}')